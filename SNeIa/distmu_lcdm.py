@@ -6,16 +6,42 @@
 code_created_by = 'Arturo_Avelino'
 # On date: 2017.04.15 (yyyy.mm.dd)
 code_name = 'distmu.py'
-version_code = '0.0.1'
-last_update = '2019.04.15'
+version_code = '0.0.2'
+last_update = '2026.10.18'
 #--------------------------------------------------------60
 
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from scipy.integrate import quad as intquad
+from scipy.interpolate import CubicHermiteSpline
+from scipy.special import hyp2f1
 
 # Speed of light
 cc = 299792.458  #  (km/s)
 
+# Settings of the single-pass cumulative integration used in the vectorized
+# functions: maximum redshift width of each integration segment and number of
+# Gauss-Legendre nodes per segment. With these values the integral of
+# InvEHubblePar agrees with 'quad' to a relative precision better than 1e-12.
+cum_zstep = 0.1
+cum_order = 8
+_gl_nodes, _gl_weights = np.polynomial.legendre.leggauss(cum_order)
+
+# Settings of the cached comoving-distance tables (see ComovDistanceTable).
+# A table has 'table_npoints' nodes uniformly spaced in ln(1+z) between
+# z = 0 and z = table_zmax; the cubic Hermite interpolation between nodes has a
+# relative error below 1e-9 compared to 'quad'. Tables are rebuilt to a higher
+# zmax when a larger redshift is requested.
+table_zmax = 10.0
+table_npoints = 2000
+table_cache_maxbytes = 64*1024**2  # bytes
+_table_cache = OrderedDict()
+
+# Default memory budget (in bytes) of the temporary arrays of each chunk of
+# cosmologies processed by DistanceMuGrid.
+grid_maxbytes = 256*1024**2
+
 #--------------------------------------------------------60
 
 # Inverse of the dimensionless Hubble parameter
@@ -25,22 +51,499 @@ def InvEHubblePar(z, OmM, wde=1.0):
     return InvEHubbleParInt
 
 # ---- The luminosity distance ----
-def LumDistanceVec(z=0.0, OmM=0.27, wde=1.0, Ho=72.0):
-    "Luminosity distance"
+def LumDistanceVec(z=0.0, OmM=0.27, wde=1.0, Ho=72.0, cached=False,
+                   analytic=True):
+    """
+    Luminosity distance
+    :param cached : if True, interpolate the cached comoving-distance table of
+        this (OmM, wde) instead of integrating (see ComovDistanceTable).
+        'z' can then be an array.
+    :type cached : bool.
+    :param analytic : if True and wde = -1 (flat LCDM), use the closed-form
+        expression of ComovDistanceFlatLCDM instead of integrating.
+        Set it to False to force the numerical integration, e.g., to
+        validate the closed form. 'z' can be an array in the analytic case.
+    :type analytic : bool.
+    """
     LumDistanceVecInt = 0.
-    LumDistanceVecInt = cc*(1.+z)*intquad(InvEHubblePar, 0., z, args=(OmM, wde))[0]/Ho
+    method = _Method(OmM, wde, cached, analytic, 'quad')
+    LumDistanceVecInt = Cosmology(OmM, wde, Ho).lum_distance(z, method)
     return LumDistanceVecInt
 
 # ---- Distance modulus scalar ----
-def DistanceMu(z, OmM=0.27, wde=1.0, Ho=72.0):
+def DistanceMu(z, OmM=0.27, wde=1.0, Ho=72.0, cached=False, analytic=True):
     "Distance modulus"
-    DistanceMuInt = 5.0*np.log10(LumDistanceVec(z, OmM, wde, Ho)) + 25.0
+    method = _Method(OmM, wde, cached, analytic, 'quad')
+    DistanceMuInt = Cosmology(OmM, wde, Ho).distance_modulus(z, method)
     return DistanceMuInt
 
 # ---- Distance modulus Vector ----
-def DistanceMuVector(z, OmM=0.27, wde=1.0, Ho=72.0):
-    "Distance modulus"
+def DistanceMuVector(z, OmM=0.27, wde=1.0, Ho=72.0, vectorized=True,
+                     cached=False, analytic=True, derivatives=False):
+    """
+    Distance modulus for an array of redshifts.
+    :param vectorized : if True, integrate InvEHubblePar in a single cumulative
+        pass over the sorted redshifts (see ComovDistanceCum) and return a
+        numpy array in the same order as 'z'. If False, call LumDistanceVec
+        (one 'quad' integration per redshift) and return a list.
+    :type vectorized : bool.
+    :param cached : if True, interpolate the cached comoving-distance table of
+        this (OmM, wde) instead (see ComovDistanceTable).
+    :type cached : bool.
+    :param analytic : if True and wde = -1 (flat LCDM), use the closed-form
+        expression of ComovDistanceFlatLCDM. Set it to False to force the
+        numerical integration.
+    :type analytic : bool.
+    :param derivatives : if True, return the tuple
+        (mu, dmu/dOmM, dmu/dwde, dmu/dHo) computed in a single pass
+        (see DistanceMuDeriv).
+    :type derivatives : bool.
+    """
+    if derivatives: return DistanceMuDeriv(z, OmM, wde, Ho)
+
+    if vectorized or cached:
+        method = _Method(OmM, wde, cached, analytic, 'cumulative')
+        DistanceMuInt = Cosmology(OmM, wde, Ho).distance_modulus(z, method)
+        return DistanceMuInt
+
     DistanceMuInt= []
     for i in range(len(z)):
-        DistanceMuInt += [5.0*np.log10(LumDistanceVec(z[i], OmM, wde, Ho)) + 25.0]
+        DistanceMuInt += [5.0*np.log10(LumDistanceVec(z[i], OmM, wde, Ho,
+                                                      analytic=analytic)) + 25.0]
     return DistanceMuInt
+
+def _Method(OmM, wde, cached, analytic, numeric):
+    "Name of the Cosmology method selected by the flags of the functions above."
+    if analytic and _IsFlatLCDM(OmM, wde): return 'analytic'
+    if cached: return 'table'
+    return numeric
+
+#--------------------------------------------------------60
+
+# ---- Dimensionless comoving distance, single cumulative pass ----
+
+def _CumulativeGrid(z):
+    """
+    Integration grid shared by all the redshifts in 'z': the sorted unique
+        values of z (plus z=0) are the knots, the gaps between them are split
+        into segments no wider than 'cum_zstep', and each segment gets
+        'cum_order' Gauss-Legendre nodes.
+    Returns the nodes and weights, shape (n_segments, cum_order), the index of
+        each original redshift in the cumulative sum and the index of z=0.
+        Non-finite redshifts do not enter the grid: z = +inf points to an
+        infinite distance and NaN or -inf to NaN (see _CumulativeIntegral).
+    """
+    z_flat = np.asarray(z, dtype=float).ravel()
+    finite = np.isfinite(z_flat)
+    z_unique, inverse = np.unique(z_flat[finite], return_inverse=True)
+    zlow = min(0.0, z_unique[0]) if z_unique.size else 0.0
+    zhigh = max(0.0, z_unique[-1]) if z_unique.size else 0.0
+
+    knots = np.union1d(np.arange(zlow, zhigh, cum_zstep),
+                       np.append(z_unique, [0.0, zhigh]))
+
+    half_width = 0.5*np.diff(knots)
+    midpoint = 0.5*(knots[1:] + knots[:-1])
+    nodes = midpoint[:, None] + half_width[:, None]*_gl_nodes[None, :]
+    weights = half_width[:, None]*_gl_weights[None, :]
+
+    index_z = np.full(z_flat.shape, knots.size + 1)
+    index_z[z_flat == np.inf] = knots.size
+    index_z[finite] = np.searchsorted(knots, z_unique)[inverse]
+    index_0 = np.searchsorted(knots, 0.0)
+    return nodes, weights, index_z, index_0
+
+def _CumulativeIntegral(integrand_np, weights, index_z, index_0):
+    """
+    Cumulative integral from z=0 given the integrand evaluated at the nodes
+        of _CumulativeGrid. The last two axes of 'integrand_np' must be
+        (n_segments, cum_order); any leading axes are kept.
+    """
+    segments = np.sum(integrand_np*weights, axis=-1)
+    # The last two entries are the values for z = +inf and for NaN.
+    cumulative = np.zeros(segments.shape[:-1] + (segments.shape[-1]+3,))
+    np.cumsum(segments, axis=-1, out=cumulative[..., 1:-2])
+    cumulative[..., -2] = np.inf
+    cumulative[..., -1] = np.nan
+    return cumulative[..., index_z] - cumulative[..., index_0:index_0+1]
+
+def ComovDistanceCum(z, OmM=0.27, wde=1.0):
+    """
+    Dimensionless line-of-sight comoving distance, i.e., the integral of
+        InvEHubblePar from 0 to z, for an array of redshifts.
+        All the redshifts are integrated at once: the integrand is evaluated
+        on a single Gauss-Legendre grid and summed cumulatively, instead of
+        running one adaptive 'quad' from 0 to z per redshift.
+    :param z : redshift(s), in any order.
+    :type z : float or ndarray.
+    :return : array with the same shape as 'z'. Multiply by cc/Ho to get Mpc.
+    """
+    z_np = np.asarray(z, dtype=float)
+    nodes, weights, index_z, index_0 = _CumulativeGrid(z_np)
+    ComovInt = _CumulativeIntegral(InvEHubblePar(nodes, OmM, wde), weights,
+                                   index_z, index_0)
+    return ComovInt.reshape(z_np.shape)[()]
+
+#--------------------------------------------------------60
+
+# ---- Derivatives with respect to the cosmological parameters ----
+#
+# With E^2 = OmM*(1+z)^3 + (1-OmM)*(1+z)^(3(1+wde)), the derivatives of the
+# comoving distance are integrals of d(1/E)/dp = -(dE^2/dp)/(2 E^3), so they are
+# integrated on the same cumulative grid as the distance itself.
+
+def DistanceMuDeriv(z, OmM=0.27, wde=1.0, Ho=72.0):
+    """
+    Distance modulus and its partial derivatives with respect to OmM, wde and
+        Ho, all of them from a single cumulative integration.
+    :param z : redshift(s), in any order.
+    :type z : float or ndarray.
+    :return : tuple (mu, dmu_dOmM, dmu_dwde, dmu_dHo) of arrays with the same
+        shape as 'z'.
+    """
+    z_np = np.asarray(z, dtype=float)
+    nodes, weights, index_z, index_0 = _CumulativeGrid(z_np)
+
+    x3 = (1.+nodes)**3.
+    x3w = (1.+nodes)**(3.*(1.+wde))
+    InvE = InvEHubblePar(nodes, OmM, wde)
+    integrand = np.array([InvE,
+                          -0.5*InvE**3*(x3 - x3w),
+                          -0.5*InvE**3*3.*(1.-OmM)*x3w*np.log1p(nodes)])
+
+    ComovInt, dComov_dOmM, dComov_dwde = _CumulativeIntegral(integrand,
+                                             weights, index_z, index_0)
+
+    factor = 5.0/np.log(10.)
+    mu_np = 5.0*np.log10(cc*(1.+z_np.ravel())*ComovInt/Ho) + 25.0
+    dmu_dOmM = factor*dComov_dOmM/ComovInt
+    dmu_dwde = factor*dComov_dwde/ComovInt
+    dmu_dHo = np.full(mu_np.shape, -factor/Ho)
+
+    return tuple(array1.reshape(z_np.shape)[()] for array1 in
+                 (mu_np, dmu_dOmM, dmu_dwde, dmu_dHo))
+
+#--------------------------------------------------------60
+
+# ---- Cached comoving-distance tables ----
+#
+# The dimensionless comoving distance only depends on (OmM, wde); Ho enters as
+# the cc/Ho prefactor. The table of each (OmM, wde) is computed once and kept
+# in '_table_cache', ordered from the least to the most recently used.
+
+def _TableNbytes(table):
+    "Memory used by an interpolation table"
+    return table.x.nbytes + table.c.nbytes
+
+def _BuildTable(OmM, wde, zmax):
+    "Cubic Hermite interpolation table of ComovDistanceCum in [0, zmax]"
+    znodes = np.expm1(np.linspace(0., np.log1p(zmax), table_npoints))
+    znodes[-1] = zmax
+    table = CubicHermiteSpline(znodes, ComovDistanceCum(znodes, OmM, wde),
+                               InvEHubblePar(znodes, OmM, wde),
+                               extrapolate=False)
+    return table
+
+def _GetTable(OmM, wde, zmax=0.0):
+    """
+    Comoving-distance table of (OmM, wde) covering at least [0, zmax], taken
+        from the cache or built and stored in it. The least recently used
+        tables are evicted while the cache is above 'table_cache_maxbytes'.
+    """
+    key = (float(OmM), float(wde))
+    table = _table_cache.get(key)
+    if not np.isfinite(zmax): zmax = 0.0
+
+    if table is None or table.x[-1] < zmax:
+        table = _BuildTable(OmM, wde, max(zmax, table_zmax))
+        _table_cache[key] = table
+
+    _table_cache.move_to_end(key)
+
+    nbytes = sum(_TableNbytes(t1) for t1 in _table_cache.values())
+    while nbytes > table_cache_maxbytes and len(_table_cache) > 1:
+        key_old, table_old = _table_cache.popitem(last=False)
+        nbytes -= _TableNbytes(table_old)
+
+    return table
+
+def set_table_cache_maxbytes(maxbytes):
+    """
+    Set the memory cap (in bytes) of the comoving-distance table cache and
+        evict the least recently used tables that do not fit.
+    """
+    global table_cache_maxbytes
+    table_cache_maxbytes = maxbytes
+    while (len(_table_cache) > 1 and sum(_TableNbytes(t1) for t1 in
+                                        _table_cache.values()) > maxbytes):
+        _table_cache.popitem(last=False)
+
+def clear_table_cache():
+    "Remove all the cached comoving-distance tables."
+    _table_cache.clear()
+
+def ComovDistanceTable(z, OmM=0.27, wde=1.0):
+    """
+    Dimensionless line-of-sight comoving distance interpolated from the cached
+        table of (OmM, wde). The first call for a given cosmology builds the
+        table; the next ones only evaluate the interpolation.
+        Relative error below 1e-9 compared to 'quad'.
+    :param z : redshift(s) >= 0.
+    :type z : float or ndarray.
+    :return : array with the same shape as 'z'. Multiply by cc/Ho to get Mpc.
+    """
+    ComovInt = Cosmology(OmM, wde).comoving_dimless(z, 'table')
+    return ComovInt
+
+#--------------------------------------------------------60
+
+# ---- Redshift from distance modulus ----
+
+def z_from_mu(mu, OmM=0.27, wde=1.0, Ho=72.0, zmax=None, niter=3):
+    """
+    Redshift that gives the distance modulus 'mu', i.e., the inverse of
+        DistanceMu, for arrays of any size.
+        A first guess is interpolated from the monotone mu(z) relation on the
+        nodes of the cached comoving-distance table (see ComovDistanceTable),
+        and then it is polished with 'niter' Newton iterations using the
+        analytic derivative dmu/dz. Three iterations are enough to reach the
+        precision of 'quad'.
+    :param mu : distance modulus(es).
+    :type mu : float or ndarray.
+    :param zmax : maximum redshift to search. Default: 'table_zmax'.
+        Values of mu beyond DistanceMu(zmax) return NaN.
+    :type zmax : float.
+    :param niter : number of Newton iterations.
+    :type niter : int.
+    """
+    if zmax is None: zmax = table_zmax
+    mu_np = np.asarray(mu, dtype=float)
+    table = _GetTable(OmM, wde, zmax)
+
+    # Monotone mu(z) on the table nodes (the node at z=0 has mu = -inf),
+    # ending exactly at zmax whatever the range of the cached table.
+    znodes = table.x[1:]
+    znodes = np.append(znodes[znodes < zmax], zmax)
+    mu_nodes = 5.0*np.log10(cc*(1.+znodes)*table(znodes)/Ho) + 25.0
+
+    # First guess: interpolation of ln(z) vs mu, that is nearly linear at low z.
+    # Below the first node use the Hubble law, z = Ho*dL/cc.
+    zz = np.exp(np.interp(mu_np, mu_nodes, np.log(znodes)))
+    below = mu_np < mu_nodes[0]
+    zz = np.where(below, Ho*10.**((mu_np-25.0)/5.0)/cc, zz)
+    outside = ~(mu_np <= mu_nodes[-1])  # also True for NaN
+
+    factor = 5.0/np.log(10.)
+    for i1 in range(niter):
+        zz = np.clip(zz, 0.0, zmax)
+        ComovInt = table(zz)
+        mu_int = 5.0*np.log10(cc*(1.+zz)*ComovInt/Ho) + 25.0
+        dmu_dz = factor*(1./(1.+zz) + InvEHubblePar(zz, OmM, wde)/ComovInt)
+        zz = zz - (mu_int - mu_np)/dmu_dz
+
+    zz = np.where(outside, np.nan, np.clip(zz, 0.0, zmax))
+    return zz[()]
+
+#--------------------------------------------------------60
+
+# ---- Closed form for flat LCDM (wde = -1) ----
+#
+# With x = 1+z and OL = 1-OmM, the integral of InvEHubblePar is the integral of
+# 1/sqrt(OmM*x^3 + OL) from x=1 to x=1+z. Its antiderivatives in terms of the
+# Gauss hypergeometric function are
+#   int_0^x  = x * 2F1(1/3, 1/2; 4/3; -OmM*x^3/OL) / sqrt(OL),
+#   int_x^oo = 2/sqrt(OmM*x) * 2F1(1/2, 1/6; 7/6; -OL/(OmM*x^3)),
+# where the first series converges for OmM*x^3 <= OL and the second one for
+# OmM*x^3 >= |OL|. Both are joined at OmM*x^3 = OL.
+# The result agrees with 'quad' to a relative precision better than 1e-9.
+
+def _IsFlatLCDM(OmM, wde):
+    "True when the closed form of ComovDistanceFlatLCDM applies."
+    return bool(np.all(np.asarray(wde) == -1.0) and np.all(np.asarray(OmM) >= 0.0))
+
+def _FlatLCDMAntiderivative(x, OmM):
+    "Integral of 1/sqrt(OmM*t^3 + 1 - OmM) from t=0 to t=x (up to a constant)."
+    x, OmM = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                 np.asarray(OmM, dtype=float))
+    OmL = 1.0 - OmM
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lower_np = x*hyp2f1(1./3, 0.5, 4./3, -OmM*x**3/OmL)/np.sqrt(OmL)
+        upper_np = 2.0/np.sqrt(OmM*x)*hyp2f1(0.5, 1./6, 7./6, -OmL/(OmM*x**3))
+
+        # Integral from 0 to infinity, only needed (and finite) when OL > 0.
+        xc = np.cbrt(OmL/OmM)
+        total_np = np.where(OmL > 0,
+            xc*hyp2f1(1./3, 0.5, 4./3, -1.)/np.sqrt(OmL) +
+            2.0/np.sqrt(OmM*xc)*hyp2f1(0.5, 1./6, 7./6, -1.), 0.)
+
+    in_lower = (OmL > 0) & (OmM*x**3 <= OmL)
+    return np.where(in_lower, lower_np, total_np - upper_np)
+
+def ComovDistanceFlatLCDM(z, OmM=0.27):
+    """
+    Dimensionless line-of-sight comoving distance for flat LCDM (wde = -1)
+        from its closed-form expression, i.e., the same as
+        ComovDistanceCum(z, OmM, -1.0) without any numerical integration.
+    :param z : redshift(s).
+    :type z : float or ndarray.
+    :param OmM : matter density, >= 0. It can be an array broadcastable
+        against 'z'.
+    :type OmM : float or ndarray.
+    """
+    ComovInt = (_FlatLCDMAntiderivative(1.+np.asarray(z, dtype=float), OmM) -
+                _FlatLCDMAntiderivative(1., OmM))
+    return ComovInt[()]
+
+#--------------------------------------------------------60
+
+# ---- Distance modulus over grids of cosmological parameters ----
+
+def _MuGridChunk(args):
+    """
+    Distance moduli of a chunk of cosmologies at the redshifts 'z'.
+    Module-level function so it can be sent to the worker processes.
+    """
+    z_flat, OmM_np, wde_np, Ho_np, analytic = args
+    if analytic and _IsFlatLCDM(OmM_np, wde_np):
+        ComovInt = ComovDistanceFlatLCDM(z_flat[None, :], OmM_np[:, None])
+    else:
+        nodes, weights, index_z, index_0 = _CumulativeGrid(z_flat)
+        integrand = InvEHubblePar(nodes[None, :, :], OmM_np[:, None, None],
+                                  wde_np[:, None, None])
+        ComovInt = _CumulativeIntegral(integrand, weights, index_z, index_0)
+    mu_np = (5.0*np.log10(cc*(1.+z_flat)[None, :]*ComovInt) -
+             5.0*np.log10(Ho_np)[:, None] + 25.0)
+    return mu_np
+
+def DistanceMuGrid(z, OmM=0.27, wde=1.0, Ho=72.0, maxbytes=None,
+                   processes=None, analytic=True):
+    """
+    Distance moduli for many cosmologies at the same redshifts in one call,
+        e.g., to compute a chi^2 over a grid of (OmM, wde) values.
+    :param z : redshifts, in any order.
+    :type z : float or ndarray.
+    :param OmM, wde, Ho : cosmological parameters. They are broadcast against
+        each other, so scalars, 1D arrays of the same length or the arrays
+        returned by np.meshgrid are all valid.
+    :type OmM, wde, Ho : float or ndarray.
+    :param maxbytes : memory budget of the temporary arrays of each chunk of
+        cosmologies. Default: 'grid_maxbytes'.
+    :type maxbytes : int.
+    :param processes : number of worker processes among which the chunks are
+        distributed. Default: None, i.e., everything runs in this process.
+    :type processes : int.
+    :param analytic : if True, chunks where all wde = -1 use the flat-LCDM
+        closed form (ComovDistanceFlatLCDM). False forces the integration.
+    :type analytic : bool.
+    :return : array of shape (broadcast shape of the parameters) + z.shape.
+    """
+    if maxbytes is None: maxbytes = grid_maxbytes
+
+    z_np = np.asarray(z, dtype=float)
+    z_flat = z_np.ravel()
+    OmM_np, wde_np, Ho_np = np.broadcast_arrays(np.asarray(OmM, dtype=float),
+                                                np.asarray(wde, dtype=float),
+                                                np.asarray(Ho, dtype=float))
+    shape_cosmo = OmM_np.shape
+    OmM_np, wde_np, Ho_np = OmM_np.ravel(), wde_np.ravel(), Ho_np.ravel()
+    n_cosmo = OmM_np.size
+
+    # Number of cosmologies per chunk: the integrand and its weighted copy,
+    # with one value per integration node, dominate the memory.
+    n_nodes = _CumulativeGrid(z_flat)[0].size
+    chunksize = int(max(1, maxbytes // (3*8*(n_nodes + z_flat.size))))
+
+    chunks_list = [(z_flat, OmM_np[i1:i1+chunksize], wde_np[i1:i1+chunksize],
+                    Ho_np[i1:i1+chunksize], analytic)
+                   for i1 in range(0, n_cosmo, chunksize)]
+
+    if processes is not None and processes > 1 and len(chunks_list) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            mu_list = list(pool.map(_MuGridChunk, chunks_list))
+    else:
+        mu_list = [_MuGridChunk(chunk1) for chunk1 in chunks_list]
+
+    if len(mu_list) == 0: mu_list = [np.zeros((0, z_flat.size))]
+    mu_np = np.concatenate(mu_list, axis=0)
+    return mu_np.reshape(shape_cosmo + z_np.shape)
+
+#--------------------------------------------------------60
+
+# ---- Cosmology object ----
+
+class Cosmology(object):
+    """
+    Flat cosmology with matter density OmM, dark energy with constant equation
+        of state wde, and Hubble constant Ho (km/s/Mpc).
+        The comoving-distance table is taken from the cache of
+        ComovDistanceTable the first time it is needed, and kept by the
+        object. When pickled (e.g., to send it to worker processes) only the
+        three parameters are saved; the table is rebuilt lazily.
+
+    The distance methods accept floats or arrays of redshifts, and the keyword
+        'method' to choose how the comoving distance is computed:
+        'auto': closed form for flat LCDM (wde = -1), otherwise 'table'.
+        'analytic': closed form (ComovDistanceFlatLCDM), only for wde = -1.
+        'table': interpolation of the comoving-distance table.
+        'cumulative': single cumulative integration (ComovDistanceCum).
+        'quad': one 'quad' integration per redshift.
+    """
+    __slots__ = ('OmM', 'wde', 'Ho', '_table')
+
+    def __init__(self, OmM=0.27, wde=1.0, Ho=72.0):
+        self.OmM = OmM
+        self.wde = wde
+        self.Ho = Ho
+        self._table = None
+
+    def __reduce__(self):
+        return (Cosmology, (self.OmM, self.wde, self.Ho))
+
+    def __repr__(self):
+        return 'Cosmology(OmM=%r, wde=%r, Ho=%r)'%(self.OmM, self.wde, self.Ho)
+
+    def table(self, zmax=0.0):
+        "Comoving-distance table of this cosmology covering [0, zmax]."
+        if self._table is None or self._table.x[-1] < zmax:
+            self._table = _GetTable(self.OmM, self.wde, zmax)
+        return self._table
+
+    def comoving_dimless(self, z, method='auto'):
+        "Dimensionless line-of-sight comoving distance, int_0^z dz'/E(z')."
+        if method == 'auto':
+            method = 'analytic' if _IsFlatLCDM(self.OmM, self.wde) else 'table'
+
+        if method == 'analytic':
+            return ComovDistanceFlatLCDM(z, self.OmM)
+        elif method == 'table':
+            z_np = np.asarray(z, dtype=float)
+            if z_np.size and z_np.min() < 0:
+                raise ValueError('Cosmology: negative redshifts are not '
+                                 'supported by the table.')
+            # Non-finite redshifts do not size the table (they give NaN).
+            z_finite = z_np[np.isfinite(z_np)]
+            zmax = z_finite.max() if z_finite.size else 0.0
+            return self.table(zmax)(z_np)[()]
+        elif method == 'cumulative':
+            return ComovDistanceCum(z, self.OmM, self.wde)
+        elif method == 'quad':
+            if np.ndim(z) == 0:
+                return intquad(InvEHubblePar, 0., z, args=(self.OmM, self.wde))[0]
+            return np.array([intquad(InvEHubblePar, 0., z1,
+                                     args=(self.OmM, self.wde))[0]
+                             for z1 in np.ravel(z)]).reshape(np.shape(z))
+        else:
+            raise ValueError("Cosmology: unknown method '%s'."%method)
+
+    def comoving_distance(self, z, method='auto'):
+        "Line-of-sight comoving distance (Mpc)."
+        return cc*self.comoving_dimless(z, method)/self.Ho
+
+    def lum_distance(self, z, method='auto'):
+        "Luminosity distance (Mpc)."
+        return cc*(1.+np.asarray(z))*self.comoving_dimless(z, method)/self.Ho
+
+    def distance_modulus(self, z, method='auto'):
+        "Distance modulus."
+        return 5.0*np.log10(self.lum_distance(z, method)) + 25.0
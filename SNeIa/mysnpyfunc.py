@@ -5,8 +5,8 @@
 code_created_by = 'Arturo_Avelino'
 # On date: '2019.06.17' (yyyy.mm.dd)
 code_name = 'mysnpyfunc.py'
-code_version = '0.1.9'
-last_update = '2019.11.01'
+code_version = '0.2.0'
+last_update = '2026.10.18'
 
 #--------------------------------------------------------60
 
@@ -14,15 +14,23 @@ from snpy import *
 from matplotlib import pyplot as plt
 import numpy as np
 import datetime # Get the current date and time
-import random # To compute k-corr uncertainties
 import json # To save the simulated mag and k-corr uncertainties.
+from mytoolsSNe import normal_draws # Draws of the k-corr simulations.
 import traceback # To print exception error in the try/except command.
+import os
+import glob
+import time
+import multiprocessing # Worker processes of snpyfit_batch.
+import signal # To stop the processes of a timed-out worker.
+from multiprocessing.connection import wait as wait_connections
+from concurrent.futures import ProcessPoolExecutor
 
 ##############################################################################80
 
 def snpyfit(sn_filename, bands_to_fit=[], obs_rest_bands=[],
             apply_kcorr=True, mangled_kcorr=True, kc_uncertainty=False,
-            apply_stretch=True, NumSim=100,
+            apply_stretch=True, NumSim=100, kc_processes=None, kc_seed=12345,
+            kc_tol=None, NumSim_min=20, kc_sampling='random',
             Ho_value=72.0, dir_save_output='', num_char_trim=-11,
             debug=False, model='EBV_model', dpi_filters=60, **args):
     """
@@ -47,6 +55,35 @@ def snpyfit(sn_filename, bands_to_fit=[], obs_rest_bands=[],
 
     dpi_filters (int): dpi resolution of the filter's plot.
 
+    kc_processes (int): number of worker processes among which the NumSim
+        k-correction simulations are split. Default: None, i.e., all the
+        simulations run in this process.
+
+    kc_seed (int): random seed of the k-correction simulations. The
+        simulated photometry of all the simulations is drawn upfront from a
+        numpy Generator with this seed, so the results do not depend on
+        kc_processes.
+
+    kc_tol (float): if given, adaptive number of k-correction simulations.
+        The running mean and std of the simulated k-corrections of every band
+        and epoch are updated after each simulation, and the simulations stop
+        when the standard error of every std, std/sqrt(2*number of
+        simulations), is smaller than kc_tol. It is an ABSOLUTE tolerance in
+        mag, e.g., kc_tol = 0.002. With kc_sampling = 'sobol' the stopping
+        rule is only tested when the number of simulations is a power of 2.
+        NumSim is then the maximum number of simulations. Default: None,
+        i.e., always NumSim simulations.
+
+    NumSim_min (int): minimum number of simulations when kc_tol is given.
+
+    kc_sampling (str): scheme to draw the simulated photometry: 'random',
+        'sobol' (scrambled quasi-Monte-Carlo points) or 'antithetic'
+        (pairs of simulations with opposite perturbations). In
+        bench_kcorr_sampling.py, 'sobol' gives the std with the precision of
+        'random' using about half the simulations (use NumSim = power of 2;
+        with kc_tol, the 'sobol' runs can only stop at a power of 2), while
+        'antithetic' does not improve the std.
+
     **args: Any additional arguments for s.fit(), for instance, Tmax, bands
 
     """
@@ -100,7 +137,7 @@ def snpyfit(sn_filename, bands_to_fit=[], obs_rest_bands=[],
               dokcorr=apply_kcorr, k_stretch=apply_stretch,
               reset_kcorrs=True, **args)
 
-        BandsToFit = s.data.keys()
+        BandsToFit = list(s.data.keys())
 
 
     if debug: print('#- %s: FITTED.'%sn_filename)
@@ -235,10 +272,32 @@ def snpyfit(sn_filename, bands_to_fit=[], obs_rest_bands=[],
         # Copying the original kcorr dictionary to initialize the dictionary
         kcorr_dict = {} # To add the simulated kcorr values.
 
-        for band3 in BandsToFit:
-            mag_dict[band3+'_0'] = list(s.data[band3].mag) # original mag data
-            errmag_fix_dict[band3] = s.data[band3].e_mag # original e_mag data
-            kcorr_dict[band3+'_0'] = list(s.ks[band3]) # original kcorr data
+        # Simulated photometry of each band: array (NumSim x n_epochs) drawn
+        # upfront, row j-1 is the photometry of the simulation j. The
+        # perturbations of all the bands come from a single matrix of
+        # standard normal draws (one column per datum).
+        mag_sim_dict = {}
+        num_epochs = [len(s.data[band3].mag) for band3 in BandsToFit]
+        z_np_list = np.split(normal_draws(NumSim, sum(num_epochs), kc_sampling,
+                                          kc_seed),
+                             np.cumsum(num_epochs)[:-1], axis=1)
+
+        # Running mean and sum of squared deviations (Welford) of the
+        # simulated kcorrs of each band and epoch (the original kcorrs are
+        # not a random draw, so they are not included).
+        mean_kc_dict = {}; m2_kc_dict = {}; std_kc_dict = {}
+
+        for band3, z_np in zip(BandsToFit, z_np_list):
+            mag_dict[band3+'_0'] = np.array(s.data[band3].mag, dtype=float) # original mag data
+            errmag_fix_dict[band3] = np.array(s.data[band3].e_mag, dtype=float) # original e_mag data
+            kcorr_dict[band3+'_0'] = np.array(s.ks[band3], dtype=float) # original kcorr data
+
+            # Gaussian random photometry around the original data.
+            mag_sim_dict[band3] = mag_dict[band3+'_0'] + errmag_fix_dict[band3]*z_np
+
+            mean_kc_dict[band3] = np.zeros_like(kcorr_dict[band3+'_0'])
+            m2_kc_dict[band3] = np.zeros_like(mean_kc_dict[band3])
+            std_kc_dict[band3] = np.zeros_like(mean_kc_dict[band3])
 
         if debug:
             print("#- Create initial mag, err_mag, kcorr, dictionaries: OK")
@@ -248,48 +307,81 @@ def snpyfit(sn_filename, bands_to_fit=[], obs_rest_bands=[],
 
         print("#- Simulating %s times the photometry and computing their \
 k-corrections."%(NumSim))
-        print('#- Loop step:', end='')
-
-        for j2 in range(NumSim): # Loop over simulations
-            for band5 in BandsToFit: # Loop over bands.
-                # Loop over photometry in a given band.
-                for i2 in range(len(s.data[band5].mag)):
-
-                    muInt = 0; sigmaInt=0; # initialize these values.
-
-                    # Defining a single datum from the original data:
-                    muInt = mag_dict[band5+'_0'][i2]
-                    sigmaInt = errmag_fix_dict[band5][i2]
-
-                    # Generate Gaussian random photometry and redefine it
-                    # as the "actual" photometry.
-                    mag_sim_int = random.gauss(muInt, sigmaInt)
-                    s.data[band5].mag[i2] = mag_sim_int
-
-            # Fit the simulated photometry in order to generate the new
-            # kcorrection values. The advantage of fitting the simulated photometry
-            # instead of just k-correcting it is that it allows to interpolate
-            # the dates with no data to BETTER derive colors and then more
-            # precise k-corr uncertainties.
-            #
-            s.fit(bands=BandsToFit, mangle=mangled_kcorr,
-                  dokcorr=apply_kcorr, k_stretch=apply_stretch,
-                  reset_kcorrs=True, **args)
-
-            # Save the new kcorr values and simulated magnitudes to the
-            # "kcorr_dict" and "mag_dict" dicts.
-            for band6 in BandsToFit:
-                kcorr_dict[band6+'_%s'%(j2+1)] = list(s.ks[band6])
-                mag_dict[band6+'_%s'%(j2+1)] = list(s.data[band6].mag)
-
-            # Print the loop step number:
-            if debug: print(", %s"%j2, end='') #
+
+        # Each group of simulations works on its own copy of the fitted SN,
+        # loaded from the '_Fit.snpy' file saved above.
+        fit_args = dict(bands=BandsToFit, mangle=mangled_kcorr,
+                        dokcorr=apply_kcorr, k_stretch=apply_stretch,
+                        reset_kcorrs=True, **args)
+        num_workers = max(1, kc_processes or 1)
+
+        pool = None
+        if num_workers > 1:
+            pool = ProcessPoolExecutor(max_workers=num_workers,
+                                       initializer=_batch_init)
+
+        # In the adaptive mode the simulations run in rounds of one simulation
+        # per worker, and the stopping rule is checked in the order of the
+        # simulation index, so the result does not depend on kc_processes.
+        NumSim_done = 0; kc_converged = False; kc_precision = np.nan
+        try:
+            while NumSim_done < NumSim and not kc_converged:
+                if kc_tol is None: sims_round = np.arange(1, NumSim+1)
+                else: sims_round = np.arange(NumSim_done+1,
+                                             min(NumSim, NumSim_done+num_workers)+1)
+
+                tasks = [(dir_save_output+snname_save+'_Fit.snpy', list(sims1),
+                          {band4: mag_sim_dict[band4][sims1-1] for band4 in BandsToFit},
+                          fit_args, debug)
+                         for sims1 in np.array_split(sims_round, num_workers)
+                         if len(sims1)]
+
+                if pool is not None:
+                    results = list(pool.map(_kcorr_sim_chunk, tasks))
+                else:
+                    results = [_kcorr_sim_chunk(task1) for task1 in tasks]
+
+                # Save the new kcorr values to the "kcorr_dict" dict and
+                # update the running mean and std.
+                for j2, kcorr_sim in sorted(sum(results, []), key=lambda r1: r1[0]):
+                    kc_precision = 0.0
+                    for band6 in BandsToFit:
+                        kcorr_dict[band6+'_%s'%j2] = kcorr_sim[band6]
+
+                        delta_np = kcorr_sim[band6] - mean_kc_dict[band6]
+                        mean_kc_dict[band6] += delta_np/float(j2)
+                        m2_kc_dict[band6] += delta_np*(kcorr_sim[band6] -
+                                                       mean_kc_dict[band6])
+                        std_kc_dict[band6] = np.sqrt(m2_kc_dict[band6]/float(j2))
+
+                        # Standard error of the std of the j2 simulations.
+                        kc_precision = max(kc_precision, np.max(
+                            std_kc_dict[band6], initial=0.0)/np.sqrt(2.0*j2))
+
+                    NumSim_done = j2
+                    # The Sobol points are balanced only in blocks of 2^k
+                    # simulations, so with 'sobol' the run stops at j2 = 2^k.
+                    balanced = kc_sampling != 'sobol' or (j2 & (j2 - 1)) == 0
+                    if (kc_tol is not None and j2 >= max(NumSim_min, 2) and
+                            balanced and kc_precision < kc_tol):
+                        kc_converged = True
+                        break
+        finally:
+            if pool is not None: pool.shutdown()
         # <<--- end main loop for k-corr uncertainties
 
+        print('#- k-corr simulations: %s (uncertainty of the k-corr std: \
+%.3g mag).'%(NumSim_done, kc_precision))
+        NumSim = NumSim_done
+
+        for band3 in BandsToFit:
+            for j1 in range(NumSim):
+                mag_dict[band3+'_%s'%(j1+1)] = mag_sim_dict[band3][j1]
+
         if debug:
             print('\n#- k-corr uncertainties computed OK. Now save the simulation.')
 
-        # Create a dictionary with the mean and standard deviation of the kcorr values
+        # Create a dictionary with the mean and standard deviation of the simulated kcorr values
         # at a given MJD for a given band.
         meanStd_kcorr_dict = {}
 
@@ -297,20 +389,33 @@ k-corrections."%(NumSim))
             meanStd_kcorr_dict[band7] = {}
             for i4 in range(len(s.data[band7].MJD)): # Loop over MJD for a given band.
                 MJD_int = s.data[band7].MJD[i4] # Define the MJD.
-                # Loop over simulations for a given MJD and band.
                 meanStd_kcorr_dict[band7][str(MJD_int)] = [
-                mean(np.array([kcorr_dict[band7+'_%s'%j3][i4] for j3 in range(NumSim+1) ])),
-                std(np.array([kcorr_dict[band7+'_%s'%j3][i4] for j3 in range(NumSim+1) ])) ]
+                    mean_kc_dict[band7][i4], std_kc_dict[band7][i4]]
+
+        # Append the precision of the simulations to the summary file.
+        textfile_1 = open(dir_save_output+snname_save+'_SummaryFit_.txt','a')
+        textfile_1.write('# k-corr uncertainties: %s simulations (kc_tol = %s, \
+NumSim_min = %s, kc_seed = %s, kc_sampling = %s)\n'%(NumSim, kc_tol,
+                          NumSim_min, kc_seed, kc_sampling))
+        textfile_1.write('# Uncertainty of the k-corr std, max std/sqrt(2*NumSim): \
+%.3g mag\n'%kc_precision)
+        if kc_tol is not None:
+            textfile_1.write('# k-corr simulations converged (uncertainty < \
+kc_tol): %s\n'%kc_converged)
+        textfile_1.close()
 
         #--- Saving the dictionaries created above above using JSON format ---
+        # The arrays are converted to lists only here.
 
         # Dictionary of Monte-Carlo simulated k-corrs
         with open(dir_save_output+snname_save+'_sim_kcorr.json', 'w') as outfile:
-            json.dump(kcorr_dict, outfile, sort_keys=True, indent=4)
+            json.dump({key1: np.asarray(v1).tolist() for key1, v1 in kcorr_dict.items()},
+                      outfile, sort_keys=True, indent=4)
 
         # Dictionary of simulated photometry.
         with open(dir_save_output+snname_save+'_sim_mag.json', 'w') as outfile:
-            json.dump(mag_dict, outfile, sort_keys=True, indent=4)
+            json.dump({key1: np.asarray(v1).tolist() for key1, v1 in mag_dict.items()},
+                      outfile, sort_keys=True, indent=4)
 
         # Dictionary of mean and standard deviation.
         with open(dir_save_output+snname_save+'_sim_kcorr_Mean_Std.json', 'w') as outfile:
@@ -441,3 +546,262 @@ to JSON files.")
     return '#---- %s done ----'%snname_save
 
 #-----------------------------------------------------------------------------80
+
+##############################################################################80
+
+#       K-CORRECTION SIMULATIONS
+
+def _kcorr_sim_chunk(task):
+    """
+    Run a group of the k-correction simulations of snpyfit on a fresh copy
+    of the fitted SN. Module-level function so it can be sent to the worker
+    processes.
+
+    Each simulation replaces the photometry by its simulated light curves
+    (one row of the arrays in mag_sim_dict), refits it and keeps the new
+    k-corrections.
+
+    Returns a list of (simulation index, kcorr dict).
+    """
+    snpy_file, sim_list, mag_sim_dict, fit_args, debug = task
+    s = get_sn(snpy_file)
+    BandsToFit = fit_args['bands']
+
+    results = []
+    for k2, j2 in enumerate(sim_list): # Loop over simulations
+        for band5 in BandsToFit: # Loop over bands.
+            s.data[band5].mag[:] = mag_sim_dict[band5][k2]
+
+        # Fit the simulated photometry in order to generate the new
+        # kcorrection values. The advantage of fitting the simulated photometry
+        # instead of just k-correcting it is that it allows to interpolate
+        # the dates with no data to BETTER derive colors and then more
+        # precise k-corr uncertainties.
+        #
+        s.fit(**fit_args)
+
+        results += [(int(j2), {band6: np.array(s.ks[band6], dtype=float)
+                               for band6 in BandsToFit})]
+
+        # Print the loop step number:
+        if debug: print("#- k-corr simulation %s done."%j2)
+
+    return results
+
+##############################################################################80
+
+#       BATCH FIT OF MANY SUPERNOVAE
+
+# snpyfit_batch runs snpyfit for every SN file in a pool of worker processes.
+# The status of each SN is kept in a JSON manifest,
+#
+#   {sn_filename: {'status': 'done' | 'failed' | 'skipped',
+#                  'message': ..., 'traceback': ..., 'time_s': ..., 'date': ...}}
+#
+# that is rewritten (atomically) every time a SN finishes, so a run that is
+# killed can be resumed: the SNe already 'done' are not fitted again.
+
+def _batch_init():
+    """
+    Initializer of each worker process: snpy is imported once per worker (it
+    is already in memory when the workers are forked) and the plots are made
+    with a non-interactive backend.
+    """
+    import snpy
+    plt.switch_backend('Agg')
+
+def _batch_fit_one(task):
+    """
+    Fit a single SN. The exceptions are caught here and returned as text, so
+    a bad file does not stop the batch.
+    :return : tuple (sn_filename, status, message, traceback, time in seconds).
+    """
+    sn_filename, snpyfit_args = task
+    time_start = time.time()
+    try:
+        message = snpyfit(sn_filename, **snpyfit_args)
+        result = (sn_filename, 'done', message, '')
+    except Exception as err:
+        result = (sn_filename, 'failed', repr(err), traceback.format_exc())
+    finally:
+        plt.close('all')
+
+    return result + (time.time() - time_start,)
+
+def _batch_worker(conn):
+    """
+    Worker process of snpyfit_batch: receives tasks through a pipe, one at a
+    time, until it gets None. The parent terminates it if a fit runs beyond
+    the time limit.
+    """
+    # Own process group, so the parent can also stop the processes started
+    # by this worker (e.g., the pool of the k-corr simulations).
+    if hasattr(os, 'setpgrp'): os.setpgrp()
+    _batch_init()
+    while True:
+        task = conn.recv()
+        if task is None: break
+        conn.send(_batch_fit_one(task))
+
+def _batch_start_worker(ctx):
+    "Start a worker process; returns its state for snpyfit_batch."
+    conn_parent, conn_child = ctx.Pipe()
+    # Not a daemon: snpyfit may start its own worker processes
+    # (kc_processes). snpyfit_batch joins or terminates the workers at the end.
+    process = ctx.Process(target=_batch_worker, args=(conn_child,))
+    process.start()
+    conn_child.close()
+    return {'process': process, 'conn': conn_parent, 'task': None,
+            'time_start': None}
+
+def _batch_stop_worker(worker):
+    "Terminate a worker process and the processes it started."
+    process = worker['process']
+    if hasattr(os, 'killpg') and process.pid is not None:
+        try: os.killpg(process.pid, signal.SIGTERM)
+        except (ProcessLookupError, PermissionError): pass
+    process.terminate()
+    process.join()
+
+def _write_manifest(manifest, manifest_file):
+    "Write the manifest to a temporary file and then rename it (atomic)."
+    file_tmp = manifest_file + '.tmp'
+    with open(file_tmp, 'w') as outfile:
+        json.dump(manifest, outfile, sort_keys=True, indent=4)
+    os.replace(file_tmp, manifest_file)
+
+def snpyfit_batch(sn_files, processes=None, timeout=None, manifest_file=None,
+                  resume=True, debug=False, **snpyfit_args):
+    """
+    Function to fit the light curves of MANY supernovae with 'snpyfit',
+    running the fits in parallel and recording the status of each one in a
+    manifest file.
+
+    sn_files (list or str): list of SN file names, or a glob pattern,
+        e.g., 'DataFiles/*_snpy.txt'.
+
+    processes (int): number of worker processes. Default: None, i.e., all
+        the CPUs. With processes = 1 and no timeout the fits run in this
+        process.
+
+    timeout (float): maximum time (in seconds) for each SN. The parent
+        process terminates the worker of a SN that runs longer (even if it
+        is stuck in compiled code), marks the SN as failed and starts a new
+        worker. Default: None, i.e., no limit.
+
+    manifest_file (str): JSON file with the status of each SN.
+        Default: dir_save_output + 'snpyfit_manifest.json'.
+
+    resume (bool): if True and the manifest exists, the SNe with status
+        'done' are skipped; the 'failed' ones are fitted again.
+
+    **snpyfit_args: any additional arguments for snpyfit, for instance,
+        bands_to_fit, kc_uncertainty, dir_save_output, model.
+
+    Returns the manifest dictionary.
+    """
+
+    if isinstance(sn_files, str): sn_files = sorted(glob.glob(sn_files))
+
+    if manifest_file is None:
+        manifest_file = snpyfit_args.get('dir_save_output', '') + \
+                        'snpyfit_manifest.json'
+
+    manifest = {}
+    if resume and os.path.exists(manifest_file):
+        with open(manifest_file, 'r') as infile: manifest = json.load(infile)
+
+    now = datetime.datetime.now().strftime("%Y.%m.%d %H:%M:%S")
+
+    # SNe to fit.
+    tasks = []
+    for sn_filename in sn_files:
+        entry = manifest.get(sn_filename, {})
+        if entry.get('status') == 'done':
+            if debug: print('#- %s: already done, skipped.'%sn_filename)
+        elif not os.path.exists(sn_filename):
+            manifest[sn_filename] = {'status': 'skipped', 'date': now,
+                                     'message': 'File not found.',
+                                     'traceback': '', 'time_s': 0.0}
+        elif sn_filename not in [task1[0] for task1 in tasks]:
+            tasks += [(sn_filename, snpyfit_args)]
+
+    _write_manifest(manifest, manifest_file)
+    print('#- snpyfit_batch: %s SNe to fit, %s already done.'%(
+        len(tasks), sum(1 for v1 in manifest.values()
+                        if v1['status'] == 'done')))
+
+    def record(result):
+        sn_filename, status, message, text_traceback, time_s = result
+        manifest[sn_filename] = {
+            'status': status, 'message': message, 'traceback': text_traceback,
+            'time_s': time_s,
+            'date': datetime.datetime.now().strftime("%Y.%m.%d %H:%M:%S")}
+        _write_manifest(manifest, manifest_file)
+        print('#- %s: %s (%.1f s).'%(sn_filename, status, time_s))
+
+    #-------------------------------------
+    if processes is None: processes = os.cpu_count()
+
+    if processes <= 1 and timeout is None:
+        for task1 in tasks: record(_batch_fit_one(task1))
+        return manifest
+
+    # Each worker fits one SN at a time; the parent waits for the results
+    # with a deadline and replaces the workers that die or run out of time.
+    ctx = multiprocessing.get_context()
+    pending = list(tasks)
+    workers = [_batch_start_worker(ctx)
+               for i1 in range(max(1, min(processes, len(tasks))))]
+    try:
+        while True:
+            for worker in workers:
+                if worker['task'] is None and pending:
+                    worker['task'] = pending.pop(0)
+                    worker['time_start'] = time.time()
+                    worker['conn'].send(worker['task'])
+
+            busy = [worker for worker in workers if worker['task'] is not None]
+            if not busy: break
+
+            wait_s = 1.0
+            if timeout is not None:
+                wait_s = max(0.0, min(worker['time_start'] + timeout
+                                      for worker in busy) - time.time())
+            ready = wait_connections([worker['conn'] for worker in busy],
+                                     timeout=wait_s)
+
+            for i1, worker in enumerate(workers):
+                if worker['task'] is None: continue
+                sn_filename = worker['task'][0]
+                time_s = time.time() - worker['time_start']
+
+                if worker['conn'] in ready:
+                    try:
+                        record(worker['conn'].recv())
+                        worker['task'] = None
+                        continue
+                    except EOFError:
+                        # The worker died (e.g., segmentation fault).
+                        message = 'Worker process died (exit code %s).'%(
+                            worker['process'].exitcode)
+                elif timeout is not None and time_s >= timeout:
+                    message = 'Time limit of %s s reached.'%timeout
+                else:
+                    continue
+
+                _batch_stop_worker(worker)
+                record((sn_filename, 'failed', message, '', time_s))
+                workers[i1] = _batch_start_worker(ctx)
+    finally:
+        for worker in workers:
+            if worker['process'].is_alive():
+                try: worker['conn'].send(None)
+                except (BrokenPipeError, OSError): pass
+        for worker in workers:
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive(): _batch_stop_worker(worker)
+
+    return manifest
+
+#-----------------------------------------------------------------------------80
@@ -5,8 +5,8 @@
 code_created_by = 'Arturo_Avelino'
 # On date: 2019.06.29 (yyyy.mm.dd)
 code_name = 'mytoolsSNe.py'
-version_code = '0.1.1'
-last_update = '2019.08.14'
+version_code = '0.1.2'
+last_update = '2026.10.18'
 #--------------------------------------------------------60
 
 import numpy as np
@@ -68,5 +68,45 @@ def sn_name(sn_filename):
 
 #-----------------------------------------------------------------------------80
 
+#       Standard normal draws for Monte-Carlo simulations
 
+def normal_draws(num_sim, num_dim, sampling='random', seed=12345):
+    """
+    Matrix (num_sim x num_dim) of standard normal draws, e.g., to perturb the
+    photometry of a light curve (one row per simulation, one column per datum).
 
+    sampling (str): scheme used to draw the rows:
+        'random': independent pseudo-random draws.
+        'sobol': scrambled Sobol points (scipy.stats.qmc) mapped through
+            the inverse of the Gaussian CDF. Better balanced when num_sim is
+            a power of 2.
+        'antithetic': pairs of rows (z, -z). With odd num_sim the last row
+            has no pair.
+
+    seed (int): random seed (also of the Sobol scrambling).
+    """
+    rng = np.random.default_rng(seed)
+
+    if sampling == 'random':
+        return rng.standard_normal((num_sim, num_dim))
+
+    elif sampling == 'antithetic':
+        z_np = rng.standard_normal(((num_sim+1)//2, num_dim))
+        return np.stack([z_np, -z_np], axis=1).reshape(-1, num_dim)[:num_sim]
+
+    elif sampling == 'sobol':
+        from scipy.stats import qmc, norm
+        sobol = qmc.Sobol(d=num_dim, scramble=True, seed=rng)
+        num_base2 = int(np.ceil(np.log2(max(num_sim, 1))))
+        u_np = sobol.random_base2(num_base2)[:num_sim]
+        # Avoid infinite values at the (unlikely) ends of [0, 1).
+        u_np = np.clip(u_np, 1e-12, 1.0 - 1e-12)
+        return norm.ppf(u_np)
+
+    else:
+        raise ValueError("normal_draws: unknown sampling '%s'."%sampling)
+
+# Tests
+# print(normal_draws(4, 3, 'antithetic'))
+
+#-----------------------------------------------------------------------------80
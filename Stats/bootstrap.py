@@ -0,0 +1,154 @@
+# Bootstrap of several statistics of the Hubble residuals from the SAME
+# resamples, so the replicates of the different statistics can be correlated.
+#
+# This is my MAIN 'bootstrap.py' function.
+#
+#--------------------------------------------------------60
+code_created_by = 'Arturo_Avelino'
+# On date: 2026.10.18 (yyyy.mm.dd)
+code_name = 'bootstrap.py'
+version_code = '0.0.1'
+last_update = '2026.10.18'
+#--------------------------------------------------------60
+
+import numpy as np
+
+from rms import boot_indices
+from intrinsic_scatter import scatter_batch
+
+#-------------------------------------------------------
+
+# Each bootstrap resample is represented by the number of times that each
+# datum is drawn (multinomial counts). A statistic is a function
+#
+#   statistic(counts_np, data) -> ndarray
+#
+# where counts_np has shape (n_resamples, ndata), 'data' is the dictionary
+# built by bootstrap_stats (keys: 'x', 'w', 's_peculiar_vel', 's_appmagTBmax'),
+# and the output has one value per resample. With counts_np = 1 for all the
+# data the statistic of the original sample is obtained.
+
+def boot_counts(index_np, ndata):
+    """
+    Convert a matrix of bootstrap indices, shape (n_resamples, ndata), to the
+        matrix of multinomial counts of each datum in each resample.
+    """
+    nrows = index_np.shape[0]
+    offset_np = ndata*np.arange(nrows)[:, None]
+    counts_np = np.bincount((index_np + offset_np).ravel(),
+                            minlength=nrows*ndata).reshape(nrows, ndata)
+    return counts_np.astype(float)
+
+def _get_data(data, key, stat_name):
+    "Return data[key], or raise an error if the statistic needs it."
+    if data.get(key) is None:
+        raise ValueError("bootstrap_stats: the statistic '%s' needs '%s'."%(
+            stat_name, key))
+    return data[key]
+
+def stat_rms(counts_np, data):
+    "rms of each resample."
+    x_np = _get_data(data, 'x', 'rms')
+    return np.sqrt(counts_np.dot(x_np**2.0)/len(x_np))
+
+def stat_wrms(counts_np, data):
+    "Weighted rms of each resample."
+    x_np = _get_data(data, 'x', 'wrms')
+    w_np = _get_data(data, 'w', 'wrms')
+    return np.sqrt(counts_np.dot(w_np*x_np**2.0)/counts_np.dot(w_np))
+
+def stat_mean(counts_np, data):
+    "Mean of each resample."
+    x_np = _get_data(data, 'x', 'mean')
+    return counts_np.dot(x_np)/len(x_np)
+
+def stat_scatter(counts_np, data):
+    "Intrinsic scatter of each resample (see intrinsic_scatter.scatter_batch)."
+    result = scatter_batch(_get_data(data, 'x', 'scatter'),
+                           _get_data(data, 's_peculiar_vel', 'scatter'),
+                           _get_data(data, 's_appmagTBmax', 'scatter'),
+                           weights_np=counts_np)
+    return result['scatter']
+
+# Registry of the statistics available by name in bootstrap_stats.
+# New statistics can be added with register_statistic.
+statistics_registry = {'rms': stat_rms, 'wrms': stat_wrms, 'mean': stat_mean,
+                       'scatter': stat_scatter}
+
+def register_statistic(name, statistic):
+    """
+    Add a statistic to the registry used by bootstrap_stats.
+    :param name : name of the statistic.
+    :type name : str.
+    :param statistic : function statistic(counts_np, data), see note above.
+    :type statistic : callable.
+    """
+    statistics_registry[name] = statistic
+
+#-------------------------------------------------------
+
+def bootstrap_stats(x_np, w_np=None, s_peculiar_vel_np=None,
+                    s_appmagTBmax_np=None,
+                    statistics=None,
+                    loopsize=1000, seed=12345, maxbytes=None):
+    """
+    Function to compute several statistics on the same bootstrap resamples.
+        Each resample is drawn only once (see rms.boot_indices) and all the
+        statistics are computed from it, so their replicates can be
+        correlated.
+    :param x_np : numpy array of data (e.g., the Hubble residuals).
+    :type x_np : ndarray.
+    :param w_np : numpy array of the weights (needed by 'wrms').
+    :type w_np : ndarray.
+    :param s_peculiar_vel_np : numpy array of peculiar-velocity uncertainties
+        (needed by 'scatter').
+    :type s_peculiar_vel_np : ndarray.
+    :param s_appmagTBmax_np : numpy array of apparent magnitude at t_Bmax
+        uncertainties (needed by 'scatter').
+    :type s_appmagTBmax_np : ndarray.
+    :param statistics : names of statistics in 'statistics_registry'.
+        Default: None, i.e., 'rms' and 'mean', plus 'wrms' if w_np is given
+        and 'scatter' if both uncertainties are given.
+    :type statistics : list or tuple.
+    :param loopsize : number of bootstrap resamples.
+    :type loopsize : integer.
+    :param seed : random seed for reproducibility.
+    :type seed : integer.
+    :param maxbytes : memory budget of each chunk of resamples.
+    :type maxbytes : integer.
+    :return : dictionary with 'names' (the statistics), 'value' (statistics
+        of the original data), 'replicates' (loopsize x n_statistics),
+        'std' (bootstrap uncertainties), 'cov' and 'corr' (covariance and
+        correlation matrices between the statistics).
+    """
+    x_np = np.asarray(x_np, dtype=float)
+    ndata = len(x_np)
+    data = {'x': x_np, 'w': w_np, 's_peculiar_vel': s_peculiar_vel_np,
+            's_appmagTBmax': s_appmagTBmax_np}
+    for key in data:
+        if data[key] is not None: data[key] = np.asarray(data[key], dtype=float)
+
+    if statistics is None:
+        statistics = ['rms'] + (['wrms'] if w_np is not None else []) + ['mean']
+        if s_peculiar_vel_np is not None and s_appmagTBmax_np is not None:
+            statistics += ['scatter']
+
+    names = list(statistics)
+    funcs = [statistics_registry[name] for name in names]
+
+    value_np = np.array([func(np.ones((1, ndata)), data)[0] for func in funcs])
+
+    replicates_list = []
+    for index_np in boot_indices(ndata, loopsize, seed, maxbytes):
+        counts_np = boot_counts(index_np, ndata)
+        replicates_list += [np.column_stack([func(counts_np, data)
+                                             for func in funcs])]
+    replicates_np = np.concatenate(replicates_list, axis=0)
+
+    cov_np = np.atleast_2d(np.cov(replicates_np, rowvar=False, bias=True))
+    std_np = np.sqrt(np.diag(cov_np))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr_np = cov_np/np.outer(std_np, std_np)
+
+    return {'names': names, 'value': value_np, 'replicates': replicates_np,
+            'std': std_np, 'cov': cov_np, 'corr': corr_np}
@@ -9,13 +9,14 @@
 code_created_by = 'Arturo_Avelino'
 # On date: 2019.05.14 (yyyy.mm.dd)
 code_name = 'fitline.py'
-code_version = '0.0.1'
-code_last_update = '2019.05.14'
+code_version = '0.0.2'
+code_last_update = '2026.10.18'
 
 #--------------------------------------------------------60
 
 from matplotlib import pyplot as plt
 import numpy as np
+from scipy.optimize import minimize_scalar
 
 ##############################################################################80
 
@@ -44,7 +45,7 @@ def lnLikelihood(m, b, Pb, Yb, eVb):
                                            + (Pb/np.sqrt(2.*np.pi*(np.exp(eVb)+M0error_zcut[i]**2.)))*np.exp(-((M0_zcut[i]-Yb)**2.)/(2.*(np.exp(eVb)+M0error_zcut[i]**2.))))
     return lnProducInt
 
-lnLikelihood(0.4, -18.91, 0.25, -18.5, 1)
+# lnLikelihood(0.4, -18.91, 0.25, -18.5, 1)
 
 #---------
 
@@ -52,5 +53,225 @@ lnLikelihood(0.4, -18.91, 0.25, -18.5, 1)
 # 3.5549744860761896
 # -15.311479267461962
 
+#--------------------------------------------------------60
+
+# Vectorized log-likelihood
+#
+# Same generative model as lnLikelihood, but the data are passed explicitly
+# (no module-level globals), all the data points are evaluated at once with
+# numpy, and the log of the sum of the two mixture components is computed
+# with np.logaddexp (a two-term logsumexp) so it does not underflow for
+# outliers far from the line.
+# The parameters are the rows theta = [m, b, Pb, Yb, eVb], with Vb = exp(eVb).
+
+# Default memory budget (in bytes) of the temporary (n_theta x n_data) arrays.
+lnlike_maxbytes = 64*1024**2
+
+def _lnMixtureTerms(theta_np, x_np, y_np, yerr_np):
+    """
+    ln of the two weighted components of the mixture for every data point,
+        ln[(1-Pb)*N(y | m*x+b, yerr^2)] and ln[Pb*N(y | Yb, Vb+yerr^2)].
+    :param theta_np : array of shape (n_theta, 5).
+    :return : two arrays of shape (n_theta, n_data).
+    """
+    m, b, Pb, Yb, eVb = [col[:, None] for col in theta_np.T]
+    var_fg = (yerr_np**2.)[None, :]
+    var_bg = np.exp(eVb) + var_fg
+
+    with np.errstate(divide='ignore'):
+        ln_fg = (np.log1p(-Pb) - 0.5*np.log(2.*np.pi*var_fg) -
+                 (y_np - m*x_np - b)**2./(2.*var_fg))
+        ln_bg = (np.log(Pb) - 0.5*np.log(2.*np.pi*var_bg) -
+                 (y_np - Yb)**2./(2.*var_bg))
+    return ln_fg, ln_bg
+
+def lnLikelihoodVec(theta, x_np, y_np, yerr_np, maxbytes=None):
+    """
+    The ln(likelihood) function of the generative model, vectorized over the
+        data and over many parameter vectors.
+    :param theta : parameters [m, b, Pb, Yb, eVb], or an array of shape
+        (..., 5) with one parameter vector per row.
+    :type theta : list or ndarray.
+    :param x_np : numpy array of the independent variable (e.g., dm15).
+    :type x_np : ndarray.
+    :param y_np : numpy array of the dependent variable (e.g., M0).
+    :type y_np : ndarray.
+    :param yerr_np : numpy array of the uncertainties of y_np.
+    :type yerr_np : ndarray.
+    :param maxbytes : memory budget of the temporary arrays; the parameter
+        vectors are processed in chunks that fit in it.
+        Default: 'lnlike_maxbytes'.
+    :type maxbytes : int.
+    :return : ln(likelihood) for each parameter vector, shape theta.shape[:-1].
+    """
+    if maxbytes is None: maxbytes = lnlike_maxbytes
+
+    theta_np = np.asarray(theta, dtype=float)
+    shape_out = theta_np.shape[:-1]
+    theta_np = theta_np.reshape(-1, 5)
+    x_np = np.asarray(x_np, dtype=float)
+    y_np = np.asarray(y_np, dtype=float)
+    yerr_np = np.asarray(yerr_np, dtype=float)
+
+    chunksize = int(max(1, maxbytes // (8*4*max(1, x_np.size))))
+    lnlike_np = np.empty(theta_np.shape[0])
+
+    for i1 in range(0, theta_np.shape[0], chunksize):
+        ln_fg, ln_bg = _lnMixtureTerms(theta_np[i1:i1+chunksize], x_np, y_np,
+                                       yerr_np)
+        lnlike_np[i1:i1+chunksize] = np.sum(np.logaddexp(ln_fg, ln_bg), axis=1)
+
+    return lnlike_np.reshape(shape_out)[()]
+
+#--------------------------------------------------------60
+
+#   Expectation-maximization (EM) fit of the generative model
+#
+# E-step: probability of each point to belong to the outlier (background)
+#   component, given the current parameters.
+# M-step: the slope and intercept are the closed-form weighted least squares
+#   solution with weights (1-p_bad)/yerr^2; Pb is the mean of p_bad; Yb is the
+#   weighted mean of y with weights p_bad/(Vb+yerr^2); and eVb = ln(Vb) is
+#   updated with a 1D Brent minimization (no closed form because of the
+#   heteroscedastic yerr).
+# Each step increases the likelihood, so the fit converges to a local maximum;
+# random restarts are used to pick the best one.
+
+def _emUpdate(theta, x_np, y_np, yerr_np):
+    """
+    One EM iteration. Returns the updated parameters, the ln(likelihood) of
+        the input parameters and the outlier probabilities of each point.
+    """
+    ln_fg, ln_bg = _lnMixtureTerms(theta[None, :], x_np, y_np, yerr_np)
+    ln_total = np.logaddexp(ln_fg[0], ln_bg[0])
+    lnlike = np.sum(ln_total)
+    prob_bad = np.exp(ln_bg[0] - ln_total)
+    prob_good = 1.0 - prob_bad
+
+    m, b, Pb, Yb, eVb = theta
+    Pb = np.mean(prob_bad)
+
+    # Weighted least squares for the line.
+    w_np = prob_good/yerr_np**2.
+    Sw, Swx, Swxx = np.sum(w_np), np.sum(w_np*x_np), np.sum(w_np*x_np**2.)
+    Swy, Swxy = np.sum(w_np*y_np), np.sum(w_np*x_np*y_np)
+    det = Sw*Swxx - Swx**2.
+    if det > 0:
+        m = (Sw*Swxy - Swx*Swy)/det
+        b = (Swxx*Swy - Swx*Swxy)/det
 
-#--------------------------------------------------------60
\ No newline at end of file
+    # Outlier distribution.
+    if np.sum(prob_bad) > 1e-10:
+        var_bg = np.exp(eVb) + yerr_np**2.
+        Yb = np.sum(prob_bad*y_np/var_bg)/np.sum(prob_bad/var_bg)
+
+        def negQ(eVb_int):
+            var_bg_int = np.exp(eVb_int) + yerr_np**2.
+            return np.sum(prob_bad*(np.log(var_bg_int) + (y_np-Yb)**2./var_bg_int))
+
+        # Bounded to the prior range of lnPosteriorVec, so the EM best fit
+        # is a valid starting point of the MCMC.
+        eVb = minimize_scalar(negQ, bounds=(eVb_min, eVb_max),
+                              method='bounded').x
+
+    return np.array([m, b, Pb, Yb, eVb]), lnlike, prob_bad
+
+def fit_em(x_np, y_np, yerr_np, n_restarts=5, maxiter=1000, tol=1e-9,
+           seed=12345):
+    """
+    Best-fit parameters of the generative model (line plus outliers) using
+        the expectation-maximization algorithm.
+    :param x_np : numpy array of the independent variable (e.g., dm15).
+    :type x_np : ndarray.
+    :param y_np : numpy array of the dependent variable (e.g., M0).
+    :type y_np : ndarray.
+    :param yerr_np : numpy array of the uncertainties of y_np.
+    :type yerr_np : ndarray.
+    :param n_restarts : number of random starting points tried in addition to
+        the ordinary least-squares one. The fit with the highest likelihood
+        is returned.
+    :type n_restarts : int.
+    :param maxiter : maximum number of EM iterations per starting point.
+    :type maxiter : int.
+    :param tol : convergence tolerance on the relative change of ln(likelihood).
+    :type tol : float.
+    :param seed : random seed of the restarts, for reproducibility.
+    :type seed : int.
+    :return : dictionary with the best-fit 'm', 'b', 'Pb', 'Yb', 'Vb', 'eVb',
+        'theta' (= [m, b, Pb, Yb, eVb], as used by lnLikelihoodVec),
+        'lnlike', 'prob_outlier' (per-point membership probability of the
+        outlier component), 'niter' and 'converged'.
+    """
+    x_np = np.asarray(x_np, dtype=float)
+    y_np = np.asarray(y_np, dtype=float)
+    yerr_np = np.asarray(yerr_np, dtype=float)
+    rng = np.random.default_rng(seed)
+
+    # Starting points: ordinary least squares line with 10% of outliers
+    # distributed as the data, plus random perturbations of it.
+    slope, intercept = np.polyfit(x_np, y_np, 1)
+    var_y = np.var(y_np) if np.var(y_np) > 0 else 1.0
+    theta_0 = np.array([slope, intercept, 0.1, np.mean(y_np), np.log(var_y)])
+    theta_list = [theta_0]
+    scale_m = np.std(y_np)/max(np.std(x_np), 1e-10)
+    for i1 in range(n_restarts):
+        theta_list += [np.array([slope + 0.5*scale_m*rng.normal(),
+                                 intercept + 0.5*np.std(y_np)*rng.normal(),
+                                 rng.uniform(0.01, 0.5),
+                                 rng.choice(y_np),
+                                 np.log(var_y) + rng.normal()])]
+    for theta in theta_list: theta[4] = np.clip(theta[4], eVb_min, eVb_max)
+
+    best = None
+    for theta in theta_list:
+        lnlike_old = -np.inf
+        converged = False
+        for niter in range(1, maxiter+1):
+            theta_new, lnlike, prob_bad = _emUpdate(theta, x_np, y_np, yerr_np)
+            if abs(lnlike - lnlike_old) <= tol*(1.0 + abs(lnlike)):
+                converged = True
+                break
+            theta, lnlike_old = theta_new, lnlike
+
+        if best is None or lnlike > best['lnlike']:
+            best = {'theta': theta, 'lnlike': lnlike, 'prob_outlier': prob_bad,
+                    'niter': niter, 'converged': converged}
+
+    m, b, Pb, Yb, eVb = best['theta']
+    best.update({'m': m, 'b': b, 'Pb': Pb, 'Yb': Yb, 'eVb': eVb,
+                 'Vb': np.exp(eVb)})
+    return best
+
+#--------------------------------------------------------60
+
+#   Log-posterior of the generative model
+#
+# Flat priors on m, b, Yb, and eVb in [eVb_min, eVb_max], and Pb in [0, 1).
+
+eVb_min, eVb_max = -20.0, 20.0
+
+def lnPosteriorVec(theta, x_np, y_np, yerr_np, maxbytes=None):
+    """
+    ln(posterior), up to a constant, of the generative model, vectorized over
+        parameter vectors like lnLikelihoodVec. Returns -np.inf outside the
+        priors. It can be used directly as the 'lnprob' of
+        mcmc.sample_ensemble.
+    :param theta : parameters [m, b, Pb, Yb, eVb], or an array of shape
+        (..., 5) with one parameter vector per row.
+    :type theta : list or ndarray.
+    """
+    theta_np = np.asarray(theta, dtype=float)
+    shape_out = theta_np.shape[:-1]
+    theta_np = theta_np.reshape(-1, 5)
+
+    inprior = ((theta_np[:, 2] >= 0.0) & (theta_np[:, 2] < 1.0) &
+               (theta_np[:, 4] >= eVb_min) & (theta_np[:, 4] <= eVb_max) &
+               np.all(np.isfinite(theta_np), axis=1))
+
+    lnpost_np = np.full(theta_np.shape[0], -np.inf)
+    if np.any(inprior):
+        lnpost_np[inprior] = lnLikelihoodVec(theta_np[inprior], x_np, y_np,
+                                             yerr_np, maxbytes)
+    return lnpost_np.reshape(shape_out)[()]
+
+#--------------------------------------------------------60
@@ -0,0 +1,179 @@
+# Dispersion statistics (rms, wrms, intrinsic scatter) and their bootstrap
+# uncertainties per group of data (e.g., per subsample flag or redshift bin),
+# computed for all the groups at once with segmented sums.
+#
+# This is my MAIN 'groupstats.py' function.
+#
+#--------------------------------------------------------60
+code_created_by = 'Arturo_Avelino'
+# On date: 2026.10.18 (yyyy.mm.dd)
+code_name = 'groupstats.py'
+version_code = '0.0.1'
+last_update = '2026.10.18'
+#--------------------------------------------------------60
+
+import numpy as np
+
+from rms import boot_maxbytes
+from intrinsic_scatter import scatter_grouped
+
+#-------------------------------------------------------
+
+def group_index(labels=None, z_np=None, bin_edges=None, ndata=None):
+    """
+    Integer group index of each datum, from either a group-label array or
+        redshift bin edges.
+    :param labels : group label of each datum (e.g., 'sampleflag').
+    :type labels : ndarray.
+    :param z_np : redshift of each datum, used with 'bin_edges'.
+    :type z_np : ndarray.
+    :param bin_edges : edges of the redshift bins. Data outside the bins get
+        the index -1 (they are ignored by grouped_stats).
+    :type bin_edges : ndarray.
+    :param ndata : number of data. Used when neither 'labels' nor 'bin_edges'
+        are given: then all the data form a single group named 'all'.
+    :type ndata : integer.
+    :return : tuple (index of each datum, names of the groups). The names are
+        the unique labels, or the (z_low, z_high) edges of each bin.
+    """
+    if labels is not None:
+        names, index_np = np.unique(np.asarray(labels), return_inverse=True)
+        return index_np.ravel(), names.tolist()
+
+    if bin_edges is None and z_np is None and ndata is not None:
+        return np.zeros(ndata, dtype=int), ['all']
+    if bin_edges is None or z_np is None:
+        raise ValueError("group_index: 'labels' or both 'z_np' and "
+                         "'bin_edges' are required.")
+
+    bin_edges = np.asarray(bin_edges, dtype=float)
+    index_np = np.searchsorted(bin_edges, np.asarray(z_np, dtype=float),
+                               side='right') - 1
+    # The last edge is included in the last bin.
+    index_np[np.asarray(z_np) == bin_edges[-1]] = len(bin_edges) - 2
+    index_np[(index_np < 0) | (index_np > len(bin_edges) - 2)] = -1
+    names = list(zip(bin_edges[:-1].tolist(), bin_edges[1:].tolist()))
+    return index_np, names
+
+def _segment_stats(x2_np, w_np, wx2_np, seg_np, nseg):
+    "rms and wrms of each segment with np.bincount."
+    count = np.bincount(seg_np, minlength=nseg)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rms_np = np.sqrt(np.bincount(seg_np, x2_np, nseg)/count)
+        wrms_np = np.sqrt(np.bincount(seg_np, wx2_np, nseg)/
+                          np.bincount(seg_np, w_np, nseg))
+    return rms_np, wrms_np
+
+#-------------------------------------------------------
+
+def grouped_stats(x_np, w_np=None, s_peculiar_vel_np=None,
+                  s_appmagTBmax_np=None, labels=None, z_np=None,
+                  bin_edges=None, loopsize=0, seed=12345, maxbytes=None):
+    """
+    Function to compute rms, wrms and intrinsic scatter (plus their
+        uncertainties) of every group of data in a single pass.
+        The bootstrap resamples are drawn within each group (stratified), and
+        all the groups and resamples of a chunk are solved together.
+    :param x_np : numpy array of data (e.g., the Hubble residuals).
+    :type x_np : ndarray.
+    :param w_np : numpy array of the weights. Default: all weights = 1.
+    :type w_np : ndarray.
+    :param s_peculiar_vel_np : numpy array of peculiar-velocity uncertainties.
+        The intrinsic scatter is only computed when the uncertainties are
+        given.
+    :type s_peculiar_vel_np : ndarray.
+    :param s_appmagTBmax_np : numpy array of apparent magnitude at t_Bmax
+        uncertainties.
+    :type s_appmagTBmax_np : ndarray.
+    :param labels, z_np, bin_edges : definition of the groups, see
+        group_index. Without them all the data form one group.
+    :param loopsize : number of bootstrap resamples. Default: 0, i.e., no
+        bootstrap uncertainties.
+    :type loopsize : integer.
+    :param seed : random seed for reproducibility.
+    :type seed : integer.
+    :param maxbytes : memory budget of each chunk of resamples.
+    :type maxbytes : integer.
+    :return : dictionary with one array per statistic, one value per group:
+        'groups' (names), 'n', 'rms', 'wrms', 'err_wrms' and, if the
+        uncertainties are given, 'err_rms', 'scatter', 'err_scatter'. With
+        loopsize > 0 also 'err_rms_boot', 'err_wrms_boot' and
+        'err_scatter_boot'.
+    """
+    if maxbytes is None: maxbytes = boot_maxbytes
+
+    group_np, names = group_index(labels, z_np, bin_edges, np.size(x_np))
+    keep = group_np >= 0
+    ngroups = len(names)
+
+    x_np = np.asarray(x_np, dtype=float)[keep]
+    group_np = group_np[keep]
+    w_np = (np.ones_like(x_np) if w_np is None else
+            np.asarray(w_np, dtype=float)[keep])
+    with_errors = s_peculiar_vel_np is not None and s_appmagTBmax_np is not None
+    if with_errors:
+        s_pv_np = np.asarray(s_peculiar_vel_np, dtype=float)*np.ones(keep.size)
+        s_mag_np = np.asarray(s_appmagTBmax_np, dtype=float)*np.ones(keep.size)
+        s_pv_np, s_mag_np = s_pv_np[keep], s_mag_np[keep]
+
+    x2_np = x_np**2.0
+    n_np = np.bincount(group_np, minlength=ngroups)
+    rms_np, wrms_np = _segment_stats(x2_np, w_np, w_np*x2_np, group_np, ngroups)
+
+    result = {'groups': names, 'n': n_np, 'rms': rms_np, 'wrms': wrms_np}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['err_wrms'] = np.sqrt(1.0/np.bincount(group_np, w_np, ngroups))
+
+    if with_errors:
+        sigma2_np = s_mag_np**2 + s_pv_np**2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['err_rms'] = np.sqrt(np.bincount(group_np, x2_np*sigma2_np,
+                                                    ngroups)/
+                                        (n_np*np.bincount(group_np, x2_np,
+                                                          ngroups)))
+        result['scatter'], result['err_scatter'] = scatter_grouped(
+            x_np, s_pv_np, s_mag_np, group_np, ngroups)[:2]
+
+    if loopsize <= 0: return result
+
+    #-----------------------------
+    # Stratified bootstrap. The data are sorted by group; position p of a
+    # resample takes a random datum of the same group as the datum at p.
+    order = np.argsort(group_np, kind='stable')
+    group_sorted = group_np[order]
+    start_np = np.concatenate(([0], np.cumsum(n_np)[:-1]))
+    start_pos = start_np[group_sorted]
+    n_pos = n_np[group_sorted]
+    ndata = x_np.size
+
+    rng = np.random.default_rng(seed)
+    chunksize = int(max(1, maxbytes // (8*8*max(1, ndata))))
+    boot_list = []
+
+    for i1 in range(0, loopsize, chunksize):
+        nrows = min(chunksize, loopsize - i1)
+        index_np = order[start_pos + rng.integers(0, n_pos, size=(nrows, ndata))]
+
+        # Segment = (resample, group).
+        seg_np = (ngroups*np.arange(nrows)[:, None] + group_sorted[None, :]).ravel()
+        index_np = index_np.ravel()
+        rms_b, wrms_b = _segment_stats(x2_np[index_np], w_np[index_np],
+                                       (w_np*x2_np)[index_np], seg_np,
+                                       nrows*ngroups)
+        stats_b = [rms_b.reshape(nrows, ngroups), wrms_b.reshape(nrows, ngroups)]
+        if with_errors:
+            scatter_b = scatter_grouped(x_np[index_np], s_pv_np[index_np],
+                                        s_mag_np[index_np], seg_np,
+                                        nrows*ngroups)[0]
+            stats_b += [scatter_b.reshape(nrows, ngroups)]
+        boot_list += [stats_b]
+
+    result['err_rms_boot'] = np.std(np.concatenate([b1[0] for b1 in boot_list]),
+                                    axis=0)
+    result['err_wrms_boot'] = np.std(np.concatenate([b1[1] for b1 in boot_list]),
+                                     axis=0)
+    if with_errors:
+        result['err_scatter_boot'] = np.std(np.concatenate(
+            [b1[2] for b1 in boot_list]), axis=0)
+
+    return result
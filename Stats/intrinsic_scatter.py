@@ -6,20 +6,49 @@
 code_created_by = 'Arturo_Avelino'
 # On date: 2017.04.15 (yyyy.mm.dd)
 code_name = 'intrinsic_scatter.py'
-version_code = '0.0.1'
-last_update = '2019.04.15'
+version_code = '0.0.2'
+last_update = '2026.10.18'
 #--------------------------------------------------------60
 
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from scipy.optimize import fmin as simplex
+from scipy.optimize import brentq
+from scipy.stats import chi2
+
+from rms import iter_chunks, stream_chunksize, _is_stream, _check_given, rms
 
 #--------------------------------------------------------60
 
 # Finding the best estimated value for sigma2Pred by minimizing the
 # -2ln(Likelihood) function, Eq. (B.6) of Blondin et al 2011.
 
+def _sum_over_data(terms, intrinsic_scatter, residuals_np, s_peculiar_vel_np,
+                   s_appmagTBmax_np, chunksize=None):
+    """
+    sum_i terms(V_i, r_i^2) for each value of the intrinsic scatter, with
+        V_i = s_appmag_i^2 + s_pv_i^2 + intrinsic_scatter^2. numpy.memmap
+        inputs and iterators of (residuals, s_pv, s_appmag) chunks are read
+        in chunks, so no full-size temporaries are created.
+    """
+    scatter2_np = np.asarray(intrinsic_scatter, dtype=float)[..., None]**2
+
+    if _is_stream(residuals_np, chunksize):
+        if chunksize is None:
+            chunksize = max(1, stream_chunksize//max(1, scatter2_np.size))
+        chunks = iter_chunks(residuals_np, s_peculiar_vel_np, s_appmagTBmax_np,
+                             chunksize=chunksize)
+    else:
+        chunks = [(residuals_np, s_peculiar_vel_np, s_appmagTBmax_np)]
+
+    sum1 = 0.0
+    for r_np, s_pv_np, s_mag_np in chunks:
+        var_np = (np.asarray(s_mag_np)**2 + np.asarray(s_pv_np)**2 +
+                  scatter2_np)
+        sum1 = sum1 + np.sum(terms(var_np, np.asarray(r_np)**2), axis=-1)
+    return np.asarray(sum1)[()]
+
 def neg2lnLikelihood(intrinsic_scatter, residuals_np, s_peculiar_vel_np,
-                    s_appmagTBmax_np):
+                    s_appmagTBmax_np, chunksize=None):
     """
     -2*log(Likelihood) function to minimized to compute the intrinsic scatter
         from the Hubble residuals. This Likelihood function comes from Eq. (6)
@@ -33,16 +62,430 @@ def neg2lnLikelihood(intrinsic_scatter, residuals_np, s_peculiar_vel_np,
     :param s_appmagTBmax_np : numpy array of apparent magnitude at t_Bmax
         uncertainties.
     :type s_appmagTBmax_np : ndarray.
+    :param chunksize : number of data per chunk to read memmaps out of core.
+    :type chunksize : int.
+    :return : float, or an array if intrinsic_scatter is an array of values.
+    """
+    return _sum_over_data(lambda var_np, r2_np: np.log(var_np) + r2_np/var_np,
+                          intrinsic_scatter, residuals_np, s_peculiar_vel_np,
+                          s_appmagTBmax_np, chunksize)
+
+def grad_neg2lnLikelihood(intrinsic_scatter, residuals_np, s_peculiar_vel_np,
+                    s_appmagTBmax_np, chunksize=None):
+    """
+    Derivative of neg2lnLikelihood with respect to the intrinsic scatter.
+    :param intrinsic_scatter : the intrinsic scatter.
+    :type intrinsic_scatter : float or ndarray.
+    :param residuals_np : numpy array of Hubble residuals.
+    :type residuals_np : ndarray.
+    :param s_peculiar_vel_np : numpy array of peculiar-velocity uncertainties.
+    :type s_peculiar_vel_np : ndarray.
+    :param s_appmagTBmax_np : numpy array of apparent magnitude at t_Bmax
+        uncertainties.
+    :type s_appmagTBmax_np : ndarray.
+    :param chunksize : number of data per chunk to read memmaps out of core.
+    :type chunksize : int.
+    """
+    scatter_np = np.asarray(intrinsic_scatter, dtype=float)
+    dsum1 = 2*scatter_np*_sum_over_data(
+        lambda var_np, r2_np: (1 - r2_np/var_np)/var_np, scatter_np,
+        residuals_np, s_peculiar_vel_np, s_appmagTBmax_np, chunksize)
+    return dsum1[()]
+
+#--------------------------------------------------------60
+
+# Solver of d(-2lnL)/d(sigma^2) = 0.
+#
+# With t = intrinsic_scatter^2, V_i = s_appmag_i^2 + s_pv_i^2 + t and the
+# residuals r_i, the function -2lnL(t) = sum_i w_i*[ln V_i + r_i^2/V_i] has
+#   d(-2lnL)/dt     = sum_i w_i*(1 - r_i^2/V_i)/V_i,
+#   d2(-2lnL)/dt2   = sum_i w_i*(2 r_i^2/V_i - 1)/V_i^2,
+# (the second one is twice the Fisher function of Eq. (B.7)). The first
+# derivative is positive for t >= max(r_i^2), so the minimum is bracketed by
+# [0, max(r_i^2)], and it is at t = 0 when the derivative is positive there.
+# The root is found by Newton iterations safeguarded with bisection, working
+# on many data sets at the same time, with the weights w_i used for resampled
+# data sets. The data sets are either the rows of 2D arrays, or segments of 1D
+# arrays given by an integer label per datum (e.g., groups or redshift bins).
+
+def _derivs_t(t_np, r2_np, e2_np, w_np):
+    "First and second derivatives of -2lnL with respect to t, for each row."
+    invvar = 1.0/(e2_np + t_np[:, None])
+    q_np = r2_np*invvar
+    d1 = np.sum(w_np*invvar*(1.0 - q_np), axis=1)
+    d2 = np.sum(w_np*invvar**2*(2.0*q_np - 1.0), axis=1)
+    return d1, d2
+
+def _derivs_t_segments(t_np, r2_np, e2_np, w_np, seg_np, active):
+    """
+    First and second derivatives of -2lnL with respect to t for the active
+        segments; t_np has one value per active segment.
+    """
+    t_full = np.zeros(active.size)
+    t_full[active] = t_np
+    sel = active[seg_np]
+    seg_sel = seg_np[sel]
+    invvar = 1.0/(e2_np[sel] + t_full[seg_sel])
+    q_np = r2_np[sel]*invvar
+    d1 = np.bincount(seg_sel, w_np[sel]*invvar*(1.0 - q_np), active.size)
+    d2 = np.bincount(seg_sel, w_np[sel]*invvar**2*(2.0*q_np - 1.0), active.size)
+    return d1[active], d2[active]
+
+def _newton_scatter2(r2_np, e2_np, w_np, t0_np, xtol=1e-12, maxiter=100):
+    """
+    Intrinsic scatter squared that minimizes -2lnL for each row of the
+        (n_sets x n_data) arrays. Returns the values of t and a convergence flag
+        for each row.
+    """
+    hi = np.max(np.where(w_np > 0, r2_np, 0.0), axis=1)
+
+    def derivs(t_np, active):
+        return _derivs_t(t_np, r2_np[active], e2_np[active], w_np[active])
+
+    return _safe_newton(derivs, hi, t0_np, xtol, maxiter)
+
+def _newton_scatter2_segments(r2_np, e2_np, w_np, seg_np, n_sets, t0_np,
+                              xtol=1e-12, maxiter=100):
+    """
+    Intrinsic scatter squared that minimizes -2lnL for each segment of the 1D
+        arrays, where seg_np (integers in [0, n_sets)) is the segment of each
+        datum. Returns the values of t and a convergence flag per segment.
+    """
+    hi = np.zeros(n_sets)
+    np.maximum.at(hi, seg_np, np.where(w_np > 0, r2_np, 0.0))
+
+    def derivs(t_np, active):
+        return _derivs_t_segments(t_np, r2_np, e2_np, w_np, seg_np, active)
+
+    return _safe_newton(derivs, hi, t0_np, xtol, maxiter)
+
+def _safe_newton(derivs, hi, t0_np, xtol, maxiter):
+    """
+    Safeguarded Newton iterations on the brackets [0, hi] of all the data
+        sets; derivs(t_np, active) returns the first and second derivatives
+        for the data sets selected by the boolean array 'active'.
+    """
+    n_sets = hi.size
+    lo = np.zeros(n_sets)
+
+    # Minimum at the boundary t = 0.
+    d1_lo = derivs(lo, np.ones(n_sets, dtype=bool))[0]
+    at_zero = (d1_lo >= 0) | (hi <= 0)
+
+    t_np = np.clip(t0_np, lo, hi)
+    t_np[at_zero] = 0.0
+    converged = at_zero.copy()
+
+    for i1 in range(maxiter):
+        if np.all(converged): break
+        active = ~converged
+        d1, d2 = derivs(t_np[active], active)
+
+        lo_a, hi_a, t_a = lo[active], hi[active], t_np[active]
+        lo_a = np.where(d1 < 0, t_a, lo_a)
+        hi_a = np.where(d1 < 0, hi_a, t_a)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_new = t_a - d1/d2
+        bisect = ~((d2 > 0) & (t_new > lo_a) & (t_new < hi_a))
+        t_new[bisect] = 0.5*(lo_a[bisect] + hi_a[bisect])
+
+        done = ((np.abs(t_new - t_a) <= xtol*(1.0 + t_a)) |
+                (hi_a - lo_a <= xtol*(1.0 + t_a)) | (d1 == 0))
+
+        lo[active], hi[active], t_np[active] = lo_a, hi_a, t_new
+        converged[active] = done
+
+    return t_np, converged
+
+def scatter_fit(residuals_np, s_peculiar_vel_np=None, s_appmagTBmax_np=None,
+                InitialGuess=0.15, xtol=1e-12, maxiter=100, chunksize=None):
+    """
+    Function to compute the intrinsic scatter, its uncertainty and a
+        convergence flag in a single call, by minimizing the
+        -2*log(Likelihood) function in Eq. (6) of Blondin et al 2011 with a
+        bounded Newton solver that uses the analytic derivatives.
+    :param residuals_np : numpy array of Hubble residuals.
+    :type residuals_np : ndarray.
+    :param s_peculiar_vel_np : numpy array of peculiar-velocity uncertainties.
+    :type s_peculiar_vel_np : ndarray.
+    :param s_appmagTBmax_np : numpy array of apparent magnitude at t_Bmax
+        uncertainties.
+    :type s_appmagTBmax_np : ndarray.
+    :param InitialGuess : Initial guess about the value of the intrinsic scatter.
+        Default value = 0.15.
+    :type InitialGuess : float.
+    :param xtol : tolerance on the intrinsic scatter squared.
+    :type xtol : float.
+    :param maxiter : maximum number of iterations.
+    :type maxiter : int.
+    :param chunksize : if given, or if the inputs are numpy.memmap arrays or a
+        function returning chunks, process the data out of core with
+        scatter_stream.
+    :type chunksize : int.
+    :return : tuple (intrinsic scatter, error_intscatter, converged). The
+        uncertainty is infinite when the best estimate is zero.
+    """
+    if (chunksize is not None or callable(residuals_np) or
+            isinstance(residuals_np, np.memmap)):
+        return scatter_stream(residuals_np, s_peculiar_vel_np, s_appmagTBmax_np,
+                              chunksize, InitialGuess, xtol, maxiter)[:3]
+
+    _check_given('scatter_fit', s_peculiar_vel_np=s_peculiar_vel_np,
+                 s_appmagTBmax_np=s_appmagTBmax_np)
+
+    r2_np = np.asarray(residuals_np, dtype=float)[None, :]**2
+    e2_np = (np.asarray(s_appmagTBmax_np, dtype=float)**2 +
+             np.asarray(s_peculiar_vel_np, dtype=float)**2)[None, :]
+    t_np, converged = _newton_scatter2(r2_np, e2_np, np.ones_like(r2_np),
+                                       np.array([InitialGuess**2]), xtol,
+                                       maxiter)
+    int_scatter = np.sqrt(t_np[0])
+    if int_scatter > 0:
+        err_scatter = error_intscatter(int_scatter, residuals_np,
+                                       s_peculiar_vel_np, s_appmagTBmax_np)
+    else:
+        err_scatter = np.inf
+    return int_scatter, err_scatter, bool(converged[0])
+
+#--------------------------------------------------------60
+
+#   Out-of-core intrinsic scatter
+#
+# The likelihood has no sufficient statistics, so each evaluation of its
+# derivatives is one pass over the data. The passes are:
+#   1) max(r_i^2), the upper end of the bracket;
+#   2) d(-2lnL)/dt at t = 0 (minimum at the boundary?);
+#   3...) one pass per Newton iteration;
+#   last) d2(-2lnL)/dt2 at the solution, for the uncertainty.
+
+def scatter_stream(residuals_np, s_peculiar_vel_np=None, s_appmagTBmax_np=None,
+                   chunksize=None, InitialGuess=0.15, xtol=1e-12, maxiter=100):
+    """
+    Function to compute the intrinsic scatter, reading the data in chunks
+        with bounded memory, e.g., from numpy.memmap arrays on disk.
+    :param residuals_np : numpy array or memmap of Hubble residuals, or a
+        function without arguments that returns a new iterable of
+        (residuals, s_peculiar_vel, s_appmagTBmax) chunks each time it is
+        called (one call per pass).
+    :type residuals_np : ndarray or callable.
+    :param s_peculiar_vel_np : array or memmap of peculiar-velocity
+        uncertainties (not used when residuals_np is a function).
+    :type s_peculiar_vel_np : ndarray.
+    :param s_appmagTBmax_np : array or memmap of apparent magnitude at t_Bmax
+        uncertainties (not used when residuals_np is a function).
+    :type s_appmagTBmax_np : ndarray.
+    :param chunksize : number of data per chunk when slicing arrays.
+        Default: rms.stream_chunksize.
+    :type chunksize : int.
+    :return : tuple (intrinsic scatter, error_intscatter, converged,
+        number of passes over the data).
+    """
+    if callable(residuals_np):
+        make_chunks = residuals_np
+    elif isinstance(residuals_np, (np.ndarray, list, tuple)):
+        _check_given('scatter_stream', s_peculiar_vel_np=s_peculiar_vel_np,
+                     s_appmagTBmax_np=s_appmagTBmax_np)
+        def make_chunks():
+            return iter_chunks(residuals_np, s_peculiar_vel_np,
+                               s_appmagTBmax_np, chunksize=chunksize)
+    else:
+        raise TypeError('scatter_stream: the data are read several times, so '
+                        'pass arrays or a function returning the chunks.')
+
+    npasses = [0]
+
+    def sums(t_value, with_max=False):
+        "One pass over the data: d1, d2 at t_value (and max r^2)."
+        npasses[0] += 1
+        d1, d2, r2_max = 0.0, 0.0, 0.0
+        for r_np, s_pv_np, s_mag_np in make_chunks():
+            r2_np = np.asarray(r_np, dtype=float)**2
+            if with_max:
+                r2_max = max(r2_max, np.max(r2_np)) if r2_np.size else r2_max
+                continue
+            invvar = 1.0/(np.asarray(s_mag_np, dtype=float)**2 +
+                          np.asarray(s_pv_np, dtype=float)**2 + t_value)
+            q_np = r2_np*invvar
+            d1 += np.sum(invvar*(1.0 - q_np))
+            d2 += np.sum(invvar**2*(2.0*q_np - 1.0))
+        return d1, d2, r2_max
+
+    def derivs(t_np, active):
+        d1, d2 = sums(t_np[0])[:2]
+        return np.array([d1]), np.array([d2])
+
+    hi = np.array([sums(0.0, with_max=True)[2]])
+    t_np, converged = _safe_newton(derivs, hi, np.array([InitialGuess**2]),
+                                   xtol, maxiter)
+
+    int_scatter = np.sqrt(t_np[0])
+    if int_scatter > 0:
+        d2 = sums(t_np[0])[1]
+        err_scatter = np.sqrt(1.0/(2.0*d2*t_np[0]))
+    else:
+        err_scatter = np.inf
+    return int_scatter, err_scatter, bool(converged[0]), npasses[0]
+
+#--------------------------------------------------------60
+
+# Intrinsic scatter of many resampled data sets (bootstrap, jackknife) at once.
+
+# Default memory budget (in bytes) of the temporary arrays of each chunk of
+# replicates processed by scatter_batch.
+batch_maxbytes = 128*1024**2
+
+def _scatter_chunk(args):
+    """
+    Intrinsic scatter, its uncertainty and convergence flag of a chunk of
+        replicates. Module-level function so it can be sent to the worker
+        processes.
+    """
+    r_np, s_pv_np, s_mag_np, w_np, InitialGuess, xtol, maxiter = args
+    r2_np = r_np**2
+    e2_np = np.broadcast_to(s_mag_np**2 + s_pv_np**2, r2_np.shape)
+    w_np = np.broadcast_to(w_np, r2_np.shape)
+    t0_np = np.full(r2_np.shape[0], InitialGuess**2)
+
+    t_np, converged = _newton_scatter2(r2_np, e2_np, w_np, t0_np, xtol, maxiter)
+
+    # Uncertainty from the (weighted) Fisher function, F = (d2(-2lnL)/dt2)/2.
+    d2 = _derivs_t(t_np, r2_np, e2_np, w_np)[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        err_np = np.where(t_np > 0, np.sqrt(1.0/(2.0*d2*t_np)), np.inf)
+    return np.sqrt(t_np), err_np, converged
+
+def scatter_batch(residuals_np, s_peculiar_vel_np, s_appmagTBmax_np,
+                  weights_np=None, InitialGuess=0.15, processes=None,
+                  maxbytes=None, percentiles=(2.5, 16., 50., 84., 97.5),
+                  xtol=1e-12, maxiter=100):
+    """
+    Function to compute the intrinsic scatter of many replicates of the
+        Hubble residuals (e.g., bootstrap or jackknife resamples) at once. All
+        the 1D maximum-likelihood problems are solved together with
+        vectorized Newton iterations (see scatter_fit).
+    :param residuals_np : Hubble residuals, shape (n_replicates, n_SNe) with
+        one resampled set per row, or (n_SNe,) when the resampling is given
+        by 'weights_np'.
+    :type residuals_np : ndarray.
+    :param s_peculiar_vel_np : peculiar-velocity uncertainties, shape (n_SNe,)
+        or (n_replicates, n_SNe).
+    :type s_peculiar_vel_np : ndarray.
+    :param s_appmagTBmax_np : apparent magnitude at t_Bmax uncertainties,
+        shape (n_SNe,) or (n_replicates, n_SNe).
+    :type s_appmagTBmax_np : ndarray.
+    :param weights_np : resampling weights, shape (n_replicates, n_SNe), e.g.,
+        the number of times each SN is drawn in a bootstrap resample, or
+        1 - np.eye(n_SNe) for the jackknife. Default: all weights = 1.
+    :type weights_np : ndarray.
+    :param InitialGuess : Initial guess about the value of the intrinsic scatter.
+    :type InitialGuess : float.
+    :param processes : number of worker processes among which the chunks of
+        replicates are distributed. Default: None, i.e., run in this process.
+    :type processes : int.
+    :param maxbytes : memory budget of the temporary arrays of each chunk.
+        Default: 'batch_maxbytes'.
+    :type maxbytes : int.
+    :param percentiles : percentiles of the replicate estimates to report.
+    :type percentiles : tuple.
+    :return : dictionary with the per-replicate 'scatter', 'error' and
+        'converged' arrays, and the 'mean', 'std' and 'percentiles'
+        (dictionary percentile -> value) of the scatter estimates.
+    """
+    if maxbytes is None: maxbytes = batch_maxbytes
+
+    r_np = np.asarray(residuals_np, dtype=float)
+    s_pv_np = np.asarray(s_peculiar_vel_np, dtype=float)
+    s_mag_np = np.asarray(s_appmagTBmax_np, dtype=float)
+    w_np = np.ones(1) if weights_np is None else np.asarray(weights_np,
+                                                            dtype=float)
+    shape = np.broadcast_shapes(np.atleast_2d(r_np).shape,
+                                np.atleast_2d(s_pv_np).shape,
+                                np.atleast_2d(s_mag_np).shape,
+                                np.atleast_2d(w_np).shape)
+    n_rep, ndata = shape
+
+    def rows(array1, i1, i2):
+        "Rows [i1:i2] of an input that can be 1D (shared by all replicates)."
+        array1 = np.atleast_2d(array1)
+        return array1 if array1.shape[0] == 1 else array1[i1:i2]
+
+    chunksize = int(max(1, maxbytes // (8*8*max(1, ndata))))
+    chunks_list = []
+    for i1 in range(0, n_rep, chunksize):
+        i2 = min(i1 + chunksize, n_rep)
+        chunks_list += [(np.broadcast_to(rows(r_np, i1, i2), (i2-i1, ndata)),
+                         rows(s_pv_np, i1, i2), rows(s_mag_np, i1, i2),
+                         rows(w_np, i1, i2), InitialGuess, xtol, maxiter)]
+
+    if processes is not None and processes > 1 and len(chunks_list) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_scatter_chunk, chunks_list))
+    else:
+        results = [_scatter_chunk(chunk1) for chunk1 in chunks_list]
+
+    scatter_np = np.concatenate([res[0] for res in results])
+    err_np = np.concatenate([res[1] for res in results])
+    converged = np.concatenate([res[2] for res in results])
+
+    return {'scatter': scatter_np, 'error': err_np, 'converged': converged,
+            'mean': np.mean(scatter_np), 'std': np.std(scatter_np),
+            'percentiles': dict(zip(percentiles,
+                                    np.percentile(scatter_np, percentiles)))}
+
+#--------------------------------------------------------60
+
+# Intrinsic scatter of many groups of data (e.g., subsamples or redshift bins)
+# in a single pass, using segmented sums instead of one mask per group.
+
+def scatter_grouped(residuals_np, s_peculiar_vel_np, s_appmagTBmax_np,
+                    groups_np, ngroups=None, weights_np=None, InitialGuess=0.15,
+                    xtol=1e-12, maxiter=100):
+    """
+    Function to compute the intrinsic scatter of every group of SNe at once.
+    :param residuals_np : numpy array of Hubble residuals.
+    :type residuals_np : ndarray.
+    :param s_peculiar_vel_np : numpy array of peculiar-velocity uncertainties.
+    :type s_peculiar_vel_np : ndarray.
+    :param s_appmagTBmax_np : numpy array of apparent magnitude at t_Bmax
+        uncertainties.
+    :type s_appmagTBmax_np : ndarray.
+    :param groups_np : integer group index of each SN, in [0, ngroups).
+    :type groups_np : ndarray.
+    :param ngroups : number of groups. Default: max(groups_np)+1.
+    :type ngroups : integer.
+    :param weights_np : weight of each SN (e.g., bootstrap counts).
+        Default: all weights = 1.
+    :type weights_np : ndarray.
+    :param InitialGuess : Initial guess about the value of the intrinsic scatter.
+    :type InitialGuess : float.
+    :return : tuple of arrays (intrinsic scatter, error_intscatter, converged)
+        with one value per group.
     """
-    sum1 = 0
-    for i in range(len(residuals_np)):
-        sum1 = (sum1 + np.log(s_appmagTBmax_np[i]**2 + intrinsic_scatter**2 +
-        s_peculiar_vel_np[i]**2) +
-        (residuals_np[i]**2)/(s_appmagTBmax_np[i]**2 + intrinsic_scatter**2 +
-        s_peculiar_vel_np[i]**2 ) )
-    return sum1
+    groups_np = np.asarray(groups_np, dtype=int).ravel()
+    if ngroups is None: ngroups = groups_np.max() + 1 if groups_np.size else 0
+    r2_np = np.asarray(residuals_np, dtype=float).ravel()**2
+    e2_np = (np.asarray(s_appmagTBmax_np, dtype=float)**2 +
+             np.asarray(s_peculiar_vel_np, dtype=float)**2)*np.ones_like(r2_np)
+    w_np = (np.ones_like(r2_np) if weights_np is None else
+            np.asarray(weights_np, dtype=float).ravel()*np.ones_like(r2_np))
+
+    t_np, converged = _newton_scatter2_segments(r2_np, e2_np, w_np, groups_np,
+                                                ngroups,
+                                                np.full(ngroups, InitialGuess**2),
+                                                xtol, maxiter)
+
+    # Uncertainty from the (weighted) Fisher function, F = (d2(-2lnL)/dt2)/2.
+    d2 = _derivs_t_segments(t_np, r2_np, e2_np, w_np, groups_np,
+                            np.ones(ngroups, dtype=bool))[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        err_np = np.where(t_np > 0, np.sqrt(1.0/(2.0*d2*t_np)), np.inf)
+    return np.sqrt(t_np), err_np, converged
 
-def scatter(residuals_np, s_peculiar_vel_np, s_appmagTBmax_np, InitialGuess=0.15):
+#--------------------------------------------------------60
+
+def scatter(residuals_np, s_peculiar_vel_np=None, s_appmagTBmax_np=None,
+            InitialGuess=0.15, chunksize=None):
     """
     Function to compute the intrinsic scatter from the Hubble residuals by
         minimizing the -2*log(Likelihood) function in Eq. (6) of Blondin et al 2011.
@@ -56,10 +499,13 @@ def scatter(residuals_np, s_peculiar_vel_np, s_appmagTBmax_np, InitialGuess=0.15
     :param InitialGuess : Initial guess about the value of the intrinsic scatter.
         Default value = 0.15.
     :type InitialGuess : float.
+    :param chunksize : number of data per chunk to process the arrays out of
+        core (see scatter_stream).
+    :type chunksize : int.
     """
-    int_scatter = simplex(neg2lnLikelihood, InitialGuess,
-                            args=(residuals_np, s_peculiar_vel_np,
-                             s_appmagTBmax_np))
+    int_scatter = scatter_fit(residuals_np, s_peculiar_vel_np,
+                              s_appmagTBmax_np, InitialGuess,
+                              chunksize=chunksize)
     return int_scatter[0]
 
 #--------------------------------------------------------60
@@ -68,7 +514,7 @@ def scatter(residuals_np, s_peculiar_vel_np, s_appmagTBmax_np, InitialGuess=0.15
 
 # Define the Fisher information matrix, Eq. (B.7) of Blondin et al 2011
 def FisherFunc(intrinsic_scatter, residuals_np, s_peculiar_vel_np,
-                s_appmagTBmax_np):
+                s_appmagTBmax_np, chunksize=None):
     """
     Function to compute the Fisher information matrix, Eq. (B.7) of
         Blondin et al 2011.
@@ -81,18 +527,17 @@ def FisherFunc(intrinsic_scatter, residuals_np, s_peculiar_vel_np,
     :param s_appmagTBmax_np : numpy array of apparent magnitude at t_Bmax
         uncertainties.
     :type s_appmagTBmax_np : ndarray.
+    :param chunksize : number of data per chunk to read memmaps out of core.
+    :type chunksize : int.
     """
-    sum2 = 0
-    for i in range(len(residuals_np)):
-        sum2 = (sum2 + (residuals_np[i]**2)/(s_appmagTBmax_np[i]**2 +
-                intrinsic_scatter**2 + s_peculiar_vel_np[i]**2)**3 -
-               1.0/( 2.0*(s_appmagTBmax_np[i]**2 + intrinsic_scatter**2 +
-                    s_peculiar_vel_np[i]**2 )**2 )  )
-    return sum2
+    return _sum_over_data(
+        lambda var_np, r2_np: r2_np/var_np**3 - 1.0/(2.0*var_np**2),
+        intrinsic_scatter, residuals_np, s_peculiar_vel_np, s_appmagTBmax_np,
+        chunksize)
 
 
 def error_intscatter(intrinsic_scatter, residuals_np, s_peculiar_vel_np,
-                    s_appmagTBmax_np):
+                    s_appmagTBmax_np, chunksize=None):
     """
     Function to uncertainty in the intrinsic dispersion.
     :param intrinsic_scatter : the intrinsic scatter.
@@ -104,9 +549,99 @@ def error_intscatter(intrinsic_scatter, residuals_np, s_peculiar_vel_np,
     :param s_appmagTBmax_np : numpy array of apparent magnitude at t_Bmax
         uncertainties.
     :type s_appmagTBmax_np : ndarray.
+    :param chunksize : number of data per chunk to read memmaps out of core.
+    :type chunksize : int.
     """
     square_sigma = 1.0/FisherFunc(intrinsic_scatter,
                                 residuals_np, s_peculiar_vel_np,
-                                s_appmagTBmax_np)
+                                s_appmagTBmax_np, chunksize)
 
     return np.sqrt(square_sigma /(4.0*intrinsic_scatter**2))
+
+#--------------------------------------------------------60
+
+#   Profile-likelihood confidence interval on the intrinsic scatter
+#
+# The interval contains the values of the intrinsic scatter where
+# -2lnL - min(-2lnL) <= Delta chi^2 (= 1 for 68.27% CL). Unlike the Fisher
+# error it is asymmetric, and when the scatter is close to zero the lower
+# limit is set to zero (the boundary of the allowed values).
+
+def scatter_interval(residuals_np, s_peculiar_vel_np, s_appmagTBmax_np,
+                     cl=0.6827, ngrid=40, InitialGuess=0.15, xtol=1e-8,
+                     max_doublings=60):
+    """
+    Function to compute the profile-likelihood confidence interval of the
+        intrinsic scatter.
+    :param residuals_np : numpy array of Hubble residuals.
+    :type residuals_np : ndarray.
+    :param s_peculiar_vel_np : numpy array of peculiar-velocity uncertainties.
+    :type s_peculiar_vel_np : ndarray.
+    :param s_appmagTBmax_np : numpy array of apparent magnitude at t_Bmax
+        uncertainties.
+    :type s_appmagTBmax_np : ndarray.
+    :param cl : confidence level. Default 0.6827, i.e., Delta chi^2 = 1.
+    :type cl : float.
+    :param ngrid : number of grid points where -2lnL is evaluated (in a
+        single vectorized call) to bracket the limits.
+    :type ngrid : int.
+    :param InitialGuess : Initial guess about the value of the intrinsic scatter.
+    :type InitialGuess : float.
+    :param xtol : tolerance of the limits.
+    :type xtol : float.
+    :param max_doublings : maximum number of times the grid is extended to
+        bracket the upper limit.
+    :type max_doublings : int.
+    :return : tuple (intrinsic scatter, lower limit, upper limit). The lower
+        limit is 0 when the interval reaches the boundary.
+    """
+    if _is_stream(residuals_np, None) and not isinstance(residuals_np,
+                                                         np.memmap):
+        raise TypeError('scatter_interval: the data are read several times, '
+                        'so pass arrays or numpy.memmap arrays.')
+    delta_chi2 = chi2.ppf(cl, 1)
+    args = (residuals_np, s_peculiar_vel_np, s_appmagTBmax_np)
+
+    # Number of data with non-finite residuals or uncertainties.
+    n_bad = _sum_over_data(lambda var_np, r2_np: ~np.isfinite(var_np + r2_np),
+                           0.0, *args)
+    if n_bad > 0:
+        raise ValueError('scatter_interval: %d data have non-finite residuals '
+                         'or uncertainties.'%n_bad)
+
+    int_scatter, err_scatter, converged = scatter_fit(*args,
+                                                      InitialGuess=InitialGuess)
+    f_min = neg2lnLikelihood(int_scatter, *args)
+
+    def delta_f(scatter1):
+        return neg2lnLikelihood(scatter1, *args) - f_min - delta_chi2
+
+    # Adaptive grid: extend the upper end until it crosses the threshold.
+    step = err_scatter if np.isfinite(err_scatter) else 0.0
+    step = max(step, 0.01*max(int_scatter, rms(residuals_np)), 1e-6)
+    s_top = int_scatter + 3.0*np.sqrt(delta_chi2)*step
+    for i1 in range(max_doublings + 1):
+        grid = np.linspace(0.0, s_top, ngrid)
+        grid = np.unique(np.append(grid, int_scatter))
+        delta_grid = delta_f(grid)
+        if delta_grid[-1] > 0: break
+        s_top = 2.0*s_top
+    else:
+        raise RuntimeError('scatter_interval: -2lnL does not cross the '
+                           'threshold below intrinsic scatter = %g.'%s_top)
+
+    i_best = np.searchsorted(grid, int_scatter)
+
+    # Upper limit: first grid point above the best value that crosses.
+    i_up = i_best + np.argmax(delta_grid[i_best:] > 0)
+    upper = brentq(delta_f, grid[i_up-1], grid[i_up], xtol=xtol)
+
+    # Lower limit: zero if the likelihood at the boundary is within the
+    # threshold, otherwise the last grid point below the best value crossing.
+    if delta_grid[0] <= 0:
+        lower = 0.0
+    else:
+        i_lo = np.nonzero(delta_grid[:i_best+1] > 0)[0][-1]
+        lower = brentq(delta_f, grid[i_lo], grid[i_lo+1], xtol=xtol)
+
+    return int_scatter, lower, upper
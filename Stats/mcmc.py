@@ -0,0 +1,222 @@
+# Affine-invariant ensemble sampler (Goodman & Weare 2010, "stretch move"),
+# vectorized over walkers, to sample posteriors such as the one of the
+# generative model in 'fitline.py'.
+#
+# This is my MAIN 'mcmc.py' function.
+#
+#--------------------------------------------------------60
+code_created_by = 'Arturo_Avelino'
+# On date: 2026.10.18 (yyyy.mm.dd)
+code_name = 'mcmc.py'
+version_code = '0.0.1'
+last_update = '2026.10.18'
+#--------------------------------------------------------60
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+#-------------------------------------------------------
+
+# The walkers are split in two halves. The walkers of each half are moved at
+# the same time using the other half as the complementary ensemble, so all the
+# log-probabilities of a half are computed in a single call:
+#
+#   lnprob(theta_np, *args) -> ndarray
+#
+# where theta_np has shape (n_walkers/2, ndim) and the output has one value
+# per row (-np.inf outside the prior).
+
+def _eval_lnprob(lnprob, theta_np, args):
+    "Evaluate lnprob on a batch of parameter vectors."
+    lnprob_np = np.asarray(lnprob(theta_np, *args), dtype=float)
+    lnprob_np[np.isnan(lnprob_np)] = -np.inf
+    return lnprob_np
+
+# lnprob and its arguments (e.g., the data) are sent to each worker process
+# only once, by the pool initializer; afterwards only the parameter vectors
+# travel between processes.
+_worker_lnprob = None
+_worker_args = ()
+
+def _worker_init(lnprob, args):
+    "Initializer of the worker processes: keep lnprob and the data."
+    global _worker_lnprob, _worker_args
+    _worker_lnprob, _worker_args = lnprob, args
+
+def _worker_eval(theta_np):
+    "lnprob of a batch of parameter vectors, in a worker process."
+    return _eval_lnprob(_worker_lnprob, theta_np, _worker_args)
+
+def _lnprob_batch(lnprob, theta_np, args, pool, processes):
+    "lnprob of the rows of theta_np, split among the worker processes if any."
+    if pool is None:
+        return _eval_lnprob(lnprob, theta_np, args)
+    tasks = [theta1 for theta1 in np.array_split(theta_np, processes)
+             if len(theta1)]
+    return np.concatenate(list(pool.map(_worker_eval, tasks)))
+
+#-------------------------------------------------------
+
+def autocorr_func(x_np):
+    """
+    Normalized autocorrelation function of a 1D chain, computed with FFT.
+    :param x_np : numpy array with the chain of a single parameter.
+    :type x_np : ndarray.
+    """
+    n = len(x_np)
+    nfft = 2**int(np.ceil(np.log2(2*n)))
+    x_np = x_np - np.mean(x_np)
+    f_np = np.fft.rfft(x_np, n=nfft)
+    acf = np.fft.irfft(f_np*np.conjugate(f_np))[:n]
+    if acf[0] == 0: return np.ones(n)
+    return acf/acf[0]
+
+def autocorr_time(chain_np, c=5.0):
+    """
+    Integrated autocorrelation time of each parameter of an ensemble chain,
+        using the autocorrelation function averaged over walkers and the
+        automatic window of Sokal (1997): the smallest window M with
+        M >= c*tau(M).
+    :param chain_np : array of shape (nsteps, nwalkers, ndim).
+    :type chain_np : ndarray.
+    :param c : window constant.
+    :type c : float.
+    :return : array with ndim autocorrelation times (in steps).
+    """
+    nsteps, nwalkers, ndim = chain_np.shape
+    tau_np = np.zeros(ndim)
+
+    for i1 in range(ndim):
+        acf = np.zeros(nsteps)
+        for j1 in range(nwalkers):
+            acf += autocorr_func(np.asarray(chain_np[:, j1, i1]))
+        acf /= nwalkers
+
+        taus = 2.0*np.cumsum(acf) - 1.0
+        window_ok = np.arange(nsteps) >= c*taus
+        window = np.argmax(window_ok) if np.any(window_ok) else nsteps - 1
+        tau_np[i1] = taus[window]
+
+    return tau_np
+
+#-------------------------------------------------------
+
+def sample_ensemble(lnprob, p0, nsteps, args=(), a=2.0, seed=12345,
+                    chain_file=None, processes=None, burn=0):
+    """
+    Sample a posterior with the affine-invariant ensemble sampler.
+    :param lnprob : vectorized log-probability, see the note above.
+        It must be a module-level function when 'processes' is used.
+    :type lnprob : callable.
+    :param p0 : initial positions of the walkers, shape (nwalkers, ndim).
+        nwalkers must be even and larger than 2*ndim, and lnprob must be
+        finite at all of them.
+    :type p0 : ndarray.
+    :param nsteps : number of steps of each walker.
+    :type nsteps : int.
+    :param args : additional arguments passed to lnprob (e.g., the data).
+    :type args : tuple.
+    :param a : scale parameter of the stretch move.
+    :type a : float.
+    :param seed : random seed, for reproducibility.
+    :type seed : int.
+    :param chain_file : if given, the chain is written step by step to this
+        '.npy' file through a memory map (and the log-probabilities to
+        '<chain_file>_lnprob.npy'), so long chains do not need to fit in RAM.
+        The returned chain is then the memory-mapped array.
+    :type chain_file : str.
+    :param processes : number of worker processes among which the
+        log-probabilities of each half of the walkers are split.
+        Default: None, i.e., everything runs in this process.
+    :type processes : int.
+    :param burn : number of initial steps excluded from the autocorrelation
+        time estimate.
+    :type burn : int.
+    :return : dictionary with 'chain' (nsteps, nwalkers, ndim), 'lnprob'
+        (nsteps, nwalkers), 'acceptance_fraction' (per walker) and 'tau'
+        (autocorrelation time per parameter, after 'burn').
+    """
+    rng = np.random.default_rng(seed)
+    positions = np.array(p0, dtype=float)
+    nwalkers, ndim = positions.shape
+    if nwalkers % 2 or nwalkers < 2*ndim:
+        raise ValueError('sample_ensemble: the number of walkers must be even '
+                         'and at least 2*ndim.')
+
+    if chain_file is not None:
+        chain_np = np.lib.format.open_memmap(chain_file, mode='w+',
+                                             dtype=float,
+                                             shape=(nsteps, nwalkers, ndim))
+        lnprob_file = chain_file[:-4] if chain_file.endswith('.npy') else chain_file
+        lnprob_chain = np.lib.format.open_memmap(lnprob_file+'_lnprob.npy',
+                                                 mode='w+', dtype=float,
+                                                 shape=(nsteps, nwalkers))
+    else:
+        chain_np = np.empty((nsteps, nwalkers, ndim))
+        lnprob_chain = np.empty((nsteps, nwalkers))
+
+    pool = None
+    if processes is not None and processes > 1:
+        pool = ProcessPoolExecutor(max_workers=processes,
+                                   initializer=_worker_init,
+                                   initargs=(lnprob, args))
+
+    try:
+        lnprob_np = _lnprob_batch(lnprob, positions, args, pool, processes)
+        if not np.all(np.isfinite(lnprob_np)):
+            raise ValueError('sample_ensemble: lnprob is not finite at the '
+                             'initial position of walkers %s; start them '
+                             'inside the prior.'%(
+                                 np.nonzero(~np.isfinite(lnprob_np))[0].tolist()))
+        naccepted = np.zeros(nwalkers)
+        half = nwalkers//2
+        halves = [np.arange(half), np.arange(half, nwalkers)]
+
+        #--------------------
+        for i1 in range(nsteps):
+            for k1 in range(2):
+                active = halves[k1]
+                complement = positions[halves[1-k1]]
+
+                # Stretch move: z ~ g(z) propto 1/sqrt(z) in [1/a, a].
+                zz = ((a - 1.0)*rng.random(half) + 1.0)**2./a
+                partners = complement[rng.integers(0, half, half)]
+                proposal = partners + zz[:, None]*(positions[active] - partners)
+
+                lnprob_new = _lnprob_batch(lnprob, proposal, args, pool,
+                                           processes)
+                lnratio = (ndim - 1.0)*np.log(zz) + lnprob_new - lnprob_np[active]
+                accept = np.log(rng.random(half)) < lnratio
+
+                positions[active[accept]] = proposal[accept]
+                lnprob_np[active[accept]] = lnprob_new[accept]
+                naccepted[active[accept]] += 1
+
+            chain_np[i1] = positions
+            lnprob_chain[i1] = lnprob_np
+    finally:
+        if pool is not None: pool.shutdown()
+
+    if chain_file is not None:
+        chain_np.flush()
+        lnprob_chain.flush()
+
+    tau_np = (autocorr_time(chain_np[burn:]) if nsteps - burn > 1
+              else np.full(ndim, np.nan))
+
+    return {'chain': chain_np, 'lnprob': lnprob_chain,
+            'acceptance_fraction': naccepted/float(max(nsteps, 1)),
+            'tau': tau_np}
+
+#-------------------------------------------------------
+
+# Example: posterior of the generative model of 'fitline.py' (x, y, yerr are
+# the data arrays), starting the walkers around the EM best fit.
+#
+# from fitline import fit_em, lnPosteriorVec
+# best = fit_em(x, y, yerr)
+# p0 = best['theta'] + 1e-3*np.random.randn(32, 5)
+# p0[:, 2] = np.clip(p0[:, 2], 1e-3, 0.99)
+# out = sample_ensemble(lnPosteriorVec, p0, 5000, args=(x, y, yerr),
+#                       chain_file='chain_fitline.npy')
+# print(out['tau'], np.mean(out['acceptance_fraction']))
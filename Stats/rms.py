@@ -6,34 +6,147 @@
 code_created_by = 'Arturo_Avelino'
 # On date: 2018.12.10 (yyyy.mm.dd)
 code_name = 'rms.py'
-version_code = '0.1.3'
-last_update = '2019.04.17'
+version_code = '0.1.4'
+last_update = '2026.10.18'
 #--------------------------------------------------------60
 
+from collections.abc import Iterator
 import numpy as np
 
+# Default memory budget (in bytes) of each chunk of bootstrap indices.
+boot_maxbytes = 64*1024**2
+
+# Default number of data per chunk when numpy.memmap arrays are processed
+# out of core (see iter_chunks).
+stream_chunksize = 2**20
+
+#-------------------------------------------------------
+
+#   Out-of-core input
+#
+# The functions rms, err_rms, wrms and err_wrms accept, besides numpy arrays:
+#   - numpy.memmap arrays (e.g., binary columns on disk, np.load(...,
+#     mmap_mode='r')), which are read in chunks of 'chunksize' data;
+#   - an iterator of chunks (e.g., a generator), passed as the first
+#     argument, yielding the arrays of each chunk (a tuple when the function
+#     takes several arrays, e.g., (x, w) for wrms). The other array
+#     arguments are then omitted.
+# In those cases the statistics are computed in one pass with a
+# DispersionAccumulator, in bounded memory (the bootstrap functions use a
+# PoissonBootstrap). Any other input (lists, pandas Series, ...) is converted
+# with np.asarray, as before.
+
+def _is_stream(x_np, chunksize):
+    "True when x_np has to be processed in chunks."
+    return (chunksize is not None or isinstance(x_np, (np.memmap, Iterator)))
+
+def iter_chunks(x_np, *others, **kwargs):
+    """
+    Generator of chunks of the data, as tuples (x, other1, other2, ...).
+    :param x_np : numpy array or memmap, or an iterator of chunks.
+    :type x_np : ndarray or iterator.
+    :param others : other arrays aligned with x_np (ignored when x_np is an
+        iterator of chunks). Scalars and None are passed unchanged.
+    :param chunksize : number of data per chunk when slicing arrays.
+        Default: 'stream_chunksize'.
+    :type chunksize : integer.
+    """
+    chunksize = kwargs.get('chunksize')
+    if chunksize is None: chunksize = stream_chunksize
+
+    if isinstance(x_np, Iterator):
+        for chunk in x_np:
+            yield tuple(chunk) if isinstance(chunk, (tuple, list)) else (chunk,)
+        return
+
+    # numpy.memmap arrays are sliced without reading them; other array-likes
+    # are converted once.
+    arrays = [a1 if isinstance(a1, np.ndarray) or a1 is None or np.ndim(a1) == 0
+              else np.asarray(a1) for a1 in (x_np,) + others]
+    for i1 in range(0, len(arrays[0]), chunksize):
+        yield tuple(np.asarray(a1[i1:i1+chunksize]) if np.ndim(a1) else a1
+                    for a1 in arrays)
+
+def _check_given(func_name, **arrays):
+    """
+    Raise ValueError if any of the arrays is None. The array arguments can
+        only be omitted when the data come as an iterator of chunks.
+    """
+    for name in sorted(arrays):
+        if arrays[name] is None:
+            raise ValueError("%s: '%s' is required for in-memory arrays."%(
+                func_name, name))
+
+#-------------------------------------------------------
+
+def boot_indices(ndata, loopsize=1000, seed=12345, maxbytes=None):
+    """
+    Bootstrap engine: generator of the index matrices of the bootstrap
+        resamples, in chunks of shape (n_resamples_in_chunk, ndata) that fit
+        in 'maxbytes'. The indices are drawn with numpy.random.Generator in
+        sequence, so the resamples for a given seed are the same whatever the
+        chunk size.
+    :param ndata : size of the data array.
+    :type ndata : integer.
+    :param loopsize : total number of bootstrap resamples.
+    :type loopsize : integer.
+    :param seed : random seed for reproducibility.
+    :type seed : integer.
+    :param maxbytes : memory budget of each chunk (the index matrix and the
+        resampled data). Default: 'boot_maxbytes'.
+    :type maxbytes : integer.
+    """
+    if maxbytes is None: maxbytes = boot_maxbytes
+    rng = np.random.default_rng(seed)
+    chunksize = int(max(1, maxbytes // (8*3*max(1, ndata))))
+
+    for i1 in range(0, loopsize, chunksize):
+        yield rng.integers(0, ndata, size=(min(chunksize, loopsize-i1), ndata))
+
 #-------------------------------------------------------
 
-def rms(x_np):
+def rms(x_np, chunksize=None):
     """
     Function to compute the simple root mean square (rms).
-    :param x_np : numpy array of data to determine their rms.
+    :param x_np : numpy array of data to determine their rms. It can also be
+        a numpy.memmap or an iterator of chunks (see iter_chunks).
     :type x_np : ndarray.
+    :param chunksize : number of data per chunk to process the array out of
+        core. Default: None, i.e., only memmaps are processed in chunks.
+    :type chunksize : integer.
     """
+    if _is_stream(x_np, chunksize):
+        acc = DispersionAccumulator()
+        for chunk in iter_chunks(x_np, chunksize=chunksize): acc.update(chunk[0])
+        return acc.rms()
+
+    x_np = np.asarray(x_np)
     N = len(x_np) # number of data
     rmsint = np.sqrt(np.sum(x_np**2.0)/N)
     return rmsint
 
 #-------------------------------------------------------
 
-def err_rms(x_np, sigma_np):
+def err_rms(x_np, sigma_np=None, chunksize=None):
     """
     Function to compute the uncertainty on rms.
-    :param x_np : numpy array of data to determine their rms.
+    :param x_np : numpy array of data to determine their rms. It can also be
+        a numpy.memmap or an iterator of (x, sigma) chunks (see iter_chunks).
     :type x_np : ndarray.
     :param sigma : numpy array of the uncertainties of the data.
     :type sigma : ndarray.
+    :param chunksize : number of data per chunk to process the arrays out of
+        core.
+    :type chunksize : integer.
     """
+    if _is_stream(x_np, chunksize):
+        acc = DispersionAccumulator()
+        for chunk in iter_chunks(x_np, sigma_np, chunksize=chunksize):
+            acc.update(chunk[0], chunk[1])
+        return acc.err_rms()
+
+    _check_given('err_rms', sigma_np=sigma_np)
+    x_np, sigma_np = np.asarray(x_np), np.asarray(sigma_np)
     N = len(x_np) # number of data
 
     # This definition comes from setting w_s = 1 in:
@@ -49,33 +162,40 @@ def err_rms(x_np, sigma_np):
 
 #-------------------------------------------------------
 
-def err_rms_boot(x_np, loopsize=1000, seed=12345):
+def err_rms_boot(x_np, loopsize=1000, seed=12345, maxbytes=None,
+                 chunksize=None):
     """
     Function to compute the uncertainty on rms using bootstrap
-    :param x_np : numpy array of data to determine their rms.
+    :param x_np : numpy array of data to determine their rms. For a
+        numpy.memmap or an iterator of chunks the streaming Poisson bootstrap
+        is used instead (see PoissonBootstrap), so the replicates differ from
+        the ones of the index bootstrap.
     :type x_np : ndarray.
     :param loopsize : loop size for bootstrap.
     :type sigma : integer.
     :param seed : random seed for reproducibility.
-    :type seed : float.
+    :type seed : integer.
+    :param maxbytes : memory budget of each chunk of resamples (see
+        boot_indices).
+    :type maxbytes : integer.
+    :param chunksize : if given, process the data out of core with the
+        Poisson bootstrap, in chunks of this size.
+    :type chunksize : integer.
     :random.seed = 12345
     """
-    ndata = len(x_np) # size of data array
-    rms_np = np.zeros(loopsize) # initialize
-    # old. random_np = np.zeros(loopsize) # initialize
-    np.random.seed(seed)
-
-    #-----------------------------
-    for i1 in range(loopsize):
-
-        # Random array with values drawn from the original data
-        random_np = np.random.choice(x_np, ndata)
+    if _is_stream(x_np, chunksize):
+        boot = PoissonBootstrap(loopsize, seed)
+        for chunk in iter_chunks(x_np, chunksize=chunksize):
+            boot.update(chunk[0], maxbytes=maxbytes)
+        return boot.err_rms()
 
-        # Compute the RMS from the random array
-        rmsint = np.sqrt(np.sum(random_np**2.0)/ndata)
+    ndata = len(x_np) # size of data array
+    x2_np = np.asarray(x_np)**2.0
 
-        # Save the RMS to an array
-        rms_np[i1] = rmsint
+    # RMS of all the resamples of each chunk at once.
+    rms_np = np.concatenate([np.sqrt(np.sum(x2_np[index_np], axis=1)/ndata)
+                             for index_np in boot_indices(ndata, loopsize,
+                                                          seed, maxbytes)])
 
     #---------
 
@@ -86,14 +206,26 @@ def err_rms_boot(x_np, loopsize=1000, seed=12345):
 
 #########################################################60
 
-def wrms(x_np, w_np):
+def wrms(x_np, w_np=None, chunksize=None):
     """
     Function to compute the weighted rms (wrms).
-    :param x : numpy array of data to determine their rms.
+    :param x : numpy array of data to determine their rms. It can also be a
+        numpy.memmap or an iterator of (x, w) chunks (see iter_chunks).
     :type x : ndarray.
     :param w : numpy array of the weights.
     :type w : ndarray.
+    :param chunksize : number of data per chunk to process the arrays out of
+        core.
+    :type chunksize : integer.
     """
+    if _is_stream(x_np, chunksize):
+        acc = DispersionAccumulator()
+        for chunk in iter_chunks(x_np, w_np, chunksize=chunksize):
+            acc.update(chunk[0], w_np=chunk[1])
+        return acc.wrms()
+
+    _check_given('wrms', w_np=w_np)
+    x_np, w_np = np.asarray(x_np), np.asarray(w_np)
     numerator = np.sum(w_np * (x_np**2.0))
     denominator = np.sum(w_np)
     wrms_out = np.sqrt(numerator/denominator)
@@ -101,16 +233,29 @@ def wrms(x_np, w_np):
 
 #-------------------------------------------------------
 
-def err_wrms(x_np, w_np, sigma_np):
+def err_wrms(x_np, w_np=None, sigma_np=None, chunksize=None):
     """
     Function to compute the uncertainty on  weighted rms (wrms).
-    :param x : numpy array of data to determine their rms.
+    :param x : numpy array of data to determine their rms. It can also be a
+        numpy.memmap or an iterator of (x, w) chunks (see iter_chunks).
     :type x: ndarray.
     :param w : numpy array of the weights.
     :type w : ndarray.
     :param sigma : numpy array of the uncertainties of the data.
     :type sigma : ndarray.
+    :param chunksize : number of data per chunk to process the arrays out of
+        core.
+    :type chunksize : integer.
     """
+    if _is_stream(x_np, chunksize):
+        acc = DispersionAccumulator()
+        for chunk in iter_chunks(x_np, w_np, chunksize=chunksize):
+            acc.update(chunk[0], w_np=chunk[1])
+        return acc.err_wrms()
+
+    _check_given('err_wrms', w_np=w_np)
+    x_np, w_np = np.asarray(x_np), np.asarray(w_np)
+
     # Compute wRMS first:
     numerator = np.sum(w_np * (x_np**2.0))
     denominator = np.sum(w_np)
@@ -131,49 +276,331 @@ def err_wrms(x_np, w_np, sigma_np):
 
 #-------------------------------------------------------
 
-def err_wrms_boot(x_np, w_np, loopsize=1000, seed=12345):
+def err_wrms_boot(x_np, w_np=None, loopsize=1000, seed=12345, maxbytes=None,
+                  chunksize=None):
     """
     Function to compute the uncertainty on wrms using bootstrap
-    :param x_np : numpy array of data to determine their wrms.
+    :param x_np : numpy array of data to determine their wrms. For a
+        numpy.memmap or an iterator of (x, w) chunks the streaming Poisson
+        bootstrap is used instead (see PoissonBootstrap).
     :type x_np : ndarray.
     :param w : numpy array of the weights.
     :param loopsize : loop size for bootstrap.
     :type sigma : integer.
     :param seed : random seed for reproducibility.
-    :type seed : float.
+    :type seed : integer.
+    :param maxbytes : memory budget of each chunk of resamples (see
+        boot_indices).
+    :type maxbytes : integer.
+    :param chunksize : if given, process the data out of core with the
+        Poisson bootstrap, in chunks of this size.
+    :type chunksize : integer.
     :random.seed = 12345
     """
+    if _is_stream(x_np, chunksize):
+        boot = PoissonBootstrap(loopsize, seed)
+        for chunk in iter_chunks(x_np, w_np, chunksize=chunksize):
+            boot.update(chunk[0], chunk[1], maxbytes=maxbytes)
+        return boot.err_wrms()
+
+    _check_given('err_wrms_boot', w_np=w_np)
     ndata = len(x_np) # size of data array
-    x_random_np = np.zeros(ndata) # initialize
-    w_random_np = np.zeros(ndata) # initialize
-    wrms_np = np.zeros(loopsize) # initialize
-    np.random.seed(seed)
+    w_np = np.asarray(w_np)
+    wx2_np = w_np * (np.asarray(x_np)**2.0)
+
+    # wRMS of all the resamples of each chunk at once.
+    wrms_list = []
+    for index_np in boot_indices(ndata, loopsize, seed, maxbytes):
+        numerator = np.sum(wx2_np[index_np], axis=1)
+        denominator = np.sum(w_np[index_np], axis=1)
+        wrms_list += [np.sqrt(numerator/denominator)]
+    wrms_np = np.concatenate(wrms_list)
+
+    #---------
 
-    #--------------------
-    for i1 in range(loopsize):
+    # Compute the standard deviation of the arrays of RMSs
+    stdev_boot = np.std(wrms_np)
 
-        # loop over data
-        for i2 in range(ndata):
+    return stdev_boot
 
-            # Random integer
-            randint = np.random.randint(0,ndata)
+#-------------------------------------------------------
 
-            x_random_np[i2] = x_np[randint]
-            w_random_np[i2] = w_np[randint]
+#########################################################60
 
-        # Compute the wRMS from the random arrays
-        numerator = np.sum(w_random_np * (x_random_np**2.0))
-        denominator = np.sum(w_random_np)
-        wrms_out = np.sqrt(numerator/denominator)
+#   Streaming (online) accumulators
+#
+# The functions above need the full arrays in memory. DispersionAccumulator
+# keeps instead the running sums needed by rms, err_rms, wrms and err_wrms:
+#   N, sum(x^2), sum((x*sigma)^2), sum(w), sum(w*x^2),
+# so the data can be ingested chunk by chunk (e.g., file by file), and the
+# accumulators of different shards or processes can be merged. The chunk sums
+# are added with Neumaier compensated summation, so the result does not
+# depend on the number of chunks beyond round-off of each chunk.
+
+class DispersionAccumulator(object):
+    """
+    Online accumulator of the sums needed by rms, err_rms, wrms and err_wrms.
 
-        # Save the wRMS to an array
-        wrms_np[i1] = wrms_out
+    Usage:
+        acc = DispersionAccumulator()
+        for x_np, sigma_np, w_np in chunks:
+            acc.update(x_np, sigma_np, w_np)
+        acc.rms(), acc.err_rms(), acc.wrms(), acc.err_wrms()
 
-    #---------
+    Accumulators of different shards are combined with acc1.merge(acc2) or
+        acc1 += acc2.
+    """
+    __slots__ = ('n', 'n_sigma', 'n_w', '_sums', '_comp')
+
+    # Order of the running sums in '_sums'.
+    _index = {'x2': 0, 'xs2': 1, 'w': 2, 'wx2': 3}
+
+    def __init__(self):
+        self.n = 0        # number of data
+        self.n_sigma = 0  # number of data with uncertainties
+        self.n_w = 0      # number of data with weights
+        self._sums = np.zeros(4)
+        self._comp = np.zeros(4)  # compensation terms
+
+    def __repr__(self):
+        return 'DispersionAccumulator(n=%s)'%self.n
+
+    def _add(self, values_np):
+        "Neumaier compensated addition of the 4 chunk sums."
+        total = self._sums + values_np
+        self._comp += np.where(np.abs(self._sums) >= np.abs(values_np),
+                               (self._sums - total) + values_np,
+                               (values_np - total) + self._sums)
+        self._sums = total
+
+    def sum(self, name):
+        "Running sum 'x2', 'xs2', 'w' or 'wx2'."
+        i1 = self._index[name]
+        return self._sums[i1] + self._comp[i1]
+
+    def update(self, x_np, sigma_np=None, w_np=None):
+        """
+        Ingest a chunk of data.
+        :param x_np : numpy array of data.
+        :type x_np : ndarray.
+        :param sigma_np : numpy array of the uncertainties of the data
+            (needed by err_rms).
+        :type sigma_np : ndarray.
+        :param w_np : numpy array of the weights (needed by wrms, err_wrms).
+        :type w_np : ndarray.
+        """
+        x2_np = np.asarray(x_np, dtype=float)**2.0
+        values_np = np.zeros(4)
+        values_np[0] = np.sum(x2_np)
+        if sigma_np is not None:
+            values_np[1] = np.sum(x2_np*np.asarray(sigma_np, dtype=float)**2.0)
+            self.n_sigma += x2_np.size
+        if w_np is not None:
+            w_np = np.asarray(w_np, dtype=float)
+            values_np[2] = np.sum(w_np*np.ones_like(x2_np))
+            values_np[3] = np.sum(w_np*x2_np)
+            self.n_w += x2_np.size
+        self.n += x2_np.size
+        self._add(values_np)
+        return self
+
+    def remove(self, x_np, sigma_np=None, w_np=None):
+        """
+        Remove a chunk of data previously ingested with update (e.g., the
+            outliers rejected by a sigma clipping).
+        """
+        other = DispersionAccumulator().update(x_np, sigma_np, w_np)
+        self.n -= other.n
+        self.n_sigma -= other.n_sigma
+        self.n_w -= other.n_w
+        self._add(-other._sums)
+        return self
+
+    def merge(self, other):
+        "Add the data of another accumulator (e.g., from another shard)."
+        self.n += other.n
+        self.n_sigma += other.n_sigma
+        self.n_w += other.n_w
+        self._add(other._sums)
+        self._add(other._comp)
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def _check(self, n_used, name):
+        if n_used != self.n:
+            raise ValueError("DispersionAccumulator: '%s' was not given for all "
+                             "the data."%name)
+
+    def rms(self):
+        "Same as rms(x_np) for all the data ingested."
+        return np.sqrt(self.sum('x2')/self.n)
+
+    def err_rms(self):
+        "Same as err_rms(x_np, sigma_np) for all the data ingested."
+        self._check(self.n_sigma, 'sigma_np')
+        return np.sqrt(self.sum('xs2')/(self.n * self.sum('x2')))
+
+    def wrms(self):
+        "Same as wrms(x_np, w_np) for all the data ingested."
+        self._check(self.n_w, 'w_np')
+        return np.sqrt(self.sum('wx2')/self.sum('w'))
+
+    def err_wrms(self):
+        "Same as err_wrms(x_np, w_np, sigma_np) for all the data ingested."
+        self._check(self.n_w, 'w_np')
+        return np.sqrt(1.0/self.sum('w'))
 
-    # Compute the standard deviation of the arrays of RMSs
-    stdev_boot = np.std(wrms_np)
+#-------------------------------------------------------
 
-    return stdev_boot
+#   Streaming Poisson bootstrap
+#
+# For data that do not fit in memory, each datum gets a random Poisson(1)
+# weight in each bootstrap replicate instead of resampling indices (Poisson
+# bootstrap). The weights of the datum with global index i are generated from
+# a counter-based random generator (Philox) whose counter starts at a value
+# determined by i, so they only depend on (seed, i, loopsize): the result is
+# the same whatever the chunking of the data, and shards processed
+# independently (with their global start index) can be merged.
+
+# Inverse CDF table of Poisson(1): P(k <= K) for K = 0, ..., 24.
+_poisson1_cdf = np.cumsum(np.exp(-1.0)/np.cumprod(np.r_[1.0, np.arange(1, 25)]))
+
+def poisson_weights(start, ndata, loopsize=1000, seed=12345):
+    """
+    Poisson(1) bootstrap weights of the data with global indices
+        start, ..., start+ndata-1, shape (ndata, loopsize).
+    :param start : global index of the first datum.
+    :type start : integer.
+    :param ndata : number of data.
+    :type ndata : integer.
+    :param loopsize : number of bootstrap replicates.
+    :type loopsize : integer.
+    :param seed : random seed for reproducibility.
+    :type seed : integer.
+    """
+    # Philox yields 4 random 64-bit integers per counter value.
+    nblocks = (loopsize + 3)//4
+    bitgen = np.random.Philox(key=seed, counter=start*nblocks)
+    raw_np = bitgen.random_raw(ndata*nblocks*4).reshape(ndata, nblocks*4)
+    uniform_np = (raw_np[:, :loopsize] >> np.uint64(11))*(1.0/2.0**53)
+    return np.searchsorted(_poisson1_cdf, uniform_np, side='right').astype(float)
+
+class PoissonBootstrap(object):
+    """
+    Streaming Poisson bootstrap of rms and wrms: one pass over the data,
+        memory proportional to loopsize only.
+
+    Usage:
+        boot = PoissonBootstrap(loopsize=1000, seed=12345)
+        for x_np, w_np in chunks:
+            boot.update(x_np, w_np)
+        boot.err_rms(), boot.err_wrms()
+
+    Shards processed separately must pass the global index of their first
+        datum as 'start' in update, and then be merged: boot1.merge(boot2).
+    """
+    __slots__ = ('loopsize', 'seed', 'n', '_sums')
+
+    def __init__(self, loopsize=1000, seed=12345):
+        self.loopsize = loopsize
+        self.seed = seed
+        self.n = 0  # number of data ingested
+        # Per-replicate sums: weights, weights*x^2, weights*w, weights*w*x^2.
+        self._sums = np.zeros((4, loopsize))
+
+    def __repr__(self):
+        return 'PoissonBootstrap(loopsize=%s, seed=%s, n=%s)'%(
+            self.loopsize, self.seed, self.n)
+
+    def update(self, x_np, w_np=None, start=None, maxbytes=None):
+        """
+        Ingest a chunk of data.
+        :param x_np : numpy array of data.
+        :type x_np : ndarray.
+        :param w_np : numpy array of the weights (needed by wrms).
+        :type w_np : ndarray.
+        :param start : global index of the first datum of the chunk.
+            Default: the number of data ingested so far.
+        :type start : integer.
+        :param maxbytes : memory budget of the Poisson weights of each
+            sub-chunk. Default: 'boot_maxbytes'.
+        :type maxbytes : integer.
+        """
+        if start is None: start = self.n
+        if maxbytes is None: maxbytes = boot_maxbytes
+        x2_np = np.asarray(x_np, dtype=float).ravel()**2.0
+        w_np = (np.ones_like(x2_np) if w_np is None else
+                np.asarray(w_np, dtype=float).ravel()*np.ones_like(x2_np))
+        chunksize = int(max(1, maxbytes // (8*3*self.loopsize)))
+
+        for i1 in range(0, x2_np.size, chunksize):
+            x2_int, w_int = x2_np[i1:i1+chunksize], w_np[i1:i1+chunksize]
+            weights_np = poisson_weights(start+i1, x2_int.size, self.loopsize,
+                                         self.seed)
+            self._sums += np.array([np.ones_like(x2_int), x2_int, w_int,
+                                    w_int*x2_int]).dot(weights_np)
+        self.n += x2_np.size
+        return self
+
+    def merge(self, other):
+        "Add the replicate sums of another shard."
+        if (other.loopsize, other.seed) != (self.loopsize, self.seed):
+            raise ValueError('PoissonBootstrap: shards with different loopsize '
+                             'or seed cannot be merged.')
+        self.n += other.n
+        self._sums += other._sums
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def rms_replicates(self):
+        "rms of each bootstrap replicate."
+        return np.sqrt(self._sums[1]/self._sums[0])
+
+    def wrms_replicates(self):
+        "wrms of each bootstrap replicate."
+        return np.sqrt(self._sums[3]/self._sums[2])
+
+    def err_rms(self):
+        "Bootstrap uncertainty on rms."
+        return np.std(self.rms_replicates())
+
+    def err_wrms(self):
+        "Bootstrap uncertainty on wrms."
+        return np.std(self.wrms_replicates())
+
+def err_rms_boot_stream(chunks, loopsize=1000, seed=12345):
+    """
+    Function to compute the uncertainty on rms with the streaming Poisson
+        bootstrap, in one pass over an iterable of data chunks (e.g., arrays
+        read from files on disk).
+    :param chunks : iterable of numpy arrays of data.
+    :type chunks : iterable.
+    :param loopsize : number of bootstrap replicates.
+    :type loopsize : integer.
+    :param seed : random seed for reproducibility.
+    :type seed : integer.
+    """
+    boot = PoissonBootstrap(loopsize, seed)
+    for x_np in chunks: boot.update(x_np)
+    return boot.err_rms()
+
+def err_wrms_boot_stream(chunks, loopsize=1000, seed=12345):
+    """
+    Function to compute the uncertainty on wrms with the streaming Poisson
+        bootstrap, in one pass over an iterable of data chunks.
+    :param chunks : iterable of (x_np, w_np) tuples.
+    :type chunks : iterable.
+    :param loopsize : number of bootstrap replicates.
+    :type loopsize : integer.
+    :param seed : random seed for reproducibility.
+    :type seed : integer.
+    """
+    boot = PoissonBootstrap(loopsize, seed)
+    for x_np, w_np in chunks: boot.update(x_np, w_np)
+    return boot.err_wrms()
 
 #-------------------------------------------------------
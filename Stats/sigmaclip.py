@@ -0,0 +1,96 @@
+# Iterative sigma clipping of Hubble residuals, updating the dispersion
+# statistics incrementally instead of recomputing them from scratch after
+# each clip.
+#
+# This is my MAIN 'sigmaclip.py' function.
+#
+#--------------------------------------------------------60
+code_created_by = 'Arturo_Avelino'
+# On date: 2026.10.18 (yyyy.mm.dd)
+code_name = 'sigmaclip.py'
+version_code = '0.0.1'
+last_update = '2026.10.18'
+#--------------------------------------------------------60
+
+import numpy as np
+
+from rms import DispersionAccumulator
+from intrinsic_scatter import scatter_batch
+
+#-------------------------------------------------------
+
+def sigma_clip(x_np, s_peculiar_vel_np, s_appmagTBmax_np, w_np=None,
+               nsigma=3.0, maxiter=20, InitialGuess=0.15):
+    """
+    Function to reject outliers iteratively: a datum is rejected when
+        |x| > nsigma*sqrt(s_appmagTBmax^2 + s_peculiar_vel^2 + scatter^2),
+        with 'scatter' the intrinsic scatter of the data kept so far.
+        The running sums of rms and wrms are kept in a DispersionAccumulator
+        and only the rejected data are subtracted at each iteration; the
+        intrinsic scatter is re-solved starting from its previous value, so
+        each iteration needs only a few Newton steps.
+    :param x_np : numpy array of data (e.g., the Hubble residuals).
+    :type x_np : ndarray.
+    :param s_peculiar_vel_np : numpy array of peculiar-velocity uncertainties.
+    :type s_peculiar_vel_np : ndarray.
+    :param s_appmagTBmax_np : numpy array of apparent magnitude at t_Bmax
+        uncertainties.
+    :type s_appmagTBmax_np : ndarray.
+    :param w_np : numpy array of the weights for wrms.
+        Default: 1/(s_appmagTBmax^2 + s_peculiar_vel^2).
+    :type w_np : ndarray.
+    :param nsigma : clipping threshold in units of the total uncertainty.
+    :type nsigma : float.
+    :param maxiter : maximum number of clipping iterations.
+    :type maxiter : integer.
+    :param InitialGuess : Initial guess about the value of the intrinsic scatter.
+    :type InitialGuess : float.
+    :return : dictionary with 'mask' (True for the data kept), 'rejected_at'
+        (iteration at which each datum was rejected, 0 if kept), 'rms',
+        'wrms', 'err_wrms', 'scatter', 'err_scatter' of the clipped sample,
+        'niter', 'converged' and 'history' (one dictionary per iteration with
+        the statistics before clipping and the number of data rejected).
+    """
+    x_np = np.asarray(x_np, dtype=float)
+    ndata = x_np.size
+    s_pv_np = np.asarray(s_peculiar_vel_np, dtype=float)*np.ones(ndata)
+    s_mag_np = np.asarray(s_appmagTBmax_np, dtype=float)*np.ones(ndata)
+    sigma2_np = s_mag_np**2 + s_pv_np**2
+    w_np = 1.0/sigma2_np if w_np is None else np.asarray(w_np, dtype=float)*np.ones(ndata)
+
+    mask = np.ones(ndata, dtype=bool)
+    rejected_at = np.zeros(ndata, dtype=int)
+    acc = DispersionAccumulator().update(x_np, w_np=w_np)
+    int_scatter = InitialGuess
+    history = []
+    converged = False
+
+    for niter in range(1, maxiter+1):
+        fit = scatter_batch(x_np, s_pv_np, s_mag_np, weights_np=mask[None, :],
+                            InitialGuess=int_scatter)
+        int_scatter = fit['scatter'][0]
+        err_scatter = fit['error'][0]
+
+        outliers = mask & (np.abs(x_np) > nsigma*np.sqrt(sigma2_np +
+                                                          int_scatter**2))
+        history += [{'iteration': niter, 'n_kept': acc.n, 'rms': acc.rms(),
+                     'wrms': acc.wrms(), 'scatter': int_scatter,
+                     'n_rejected': int(np.sum(outliers))}]
+
+        if not np.any(outliers):
+            converged = True
+            break
+
+        acc.remove(x_np[outliers], w_np=w_np[outliers])
+        mask[outliers] = False
+        rejected_at[outliers] = niter
+
+    if not converged:
+        fit = scatter_batch(x_np, s_pv_np, s_mag_np, weights_np=mask[None, :],
+                            InitialGuess=int_scatter)
+        int_scatter, err_scatter = fit['scatter'][0], fit['error'][0]
+
+    return {'mask': mask, 'rejected_at': rejected_at, 'rms': acc.rms(),
+            'wrms': acc.wrms(), 'err_wrms': acc.err_wrms(),
+            'scatter': int_scatter, 'err_scatter': err_scatter,
+            'niter': niter, 'converged': converged, 'history': history}